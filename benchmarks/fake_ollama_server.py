@@ -0,0 +1,298 @@
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+# Text only present in the plan-generation prompt (config/simulation_prompt.yml)
+PLAN_PROMPT_MARKER = "reasoning_steps"
+
+
+def build_scripted_plan(question: str, tool_steps: int = 1, inference_steps: int = 1, tool_name: str = "get_current_time") -> dict:
+    """
+    Build a deterministic plan: independent tool steps, inference steps that
+    depend on all of them, and a final wrap-up step depending on everything.
+    """
+    steps = []
+    for i in range(tool_steps):
+        steps.append({
+            "step_id": len(steps) + 1,
+            "step_type": "tool_use",
+            "description": f"Call {tool_name} to fetch live data ({i + 1})",
+            "dependencies": []
+        })
+    tool_ids = [s["step_id"] for s in steps]
+    for i in range(inference_steps):
+        steps.append({
+            "step_id": len(steps) + 1,
+            "step_type": "inference",
+            "description": f"Reason about the fetched data ({i + 1})",
+            "dependencies": tool_ids
+        })
+    steps.append({
+        "step_id": len(steps) + 1,
+        "step_type": "inference",
+        "description": "Wrap up everything and provide the final answer",
+        "dependencies": [s["step_id"] for s in steps]
+    })
+    return {
+        "original_question": question,
+        "intent": "benchmark",
+        "reasoning_steps": steps,
+        "final_output_format": "plain_text"
+    }
+
+
+class FakeOllamaServer:
+    """
+    🔹 FakeOllamaServer: Local stand-in for the Ollama HTTP API used by benchmarks.
+
+    Responsibilities:
+    - Serve /api/chat (streaming and not), /api/generate, /api/tags and /api/ps.
+    - Return scripted plans, tool calls and answers with configurable
+      time-to-first-token and token rate.
+    - Count requests and concurrency so several instances can stand in for a cluster.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        models: Optional[list[str]] = None,
+        latency: float = 0.05,
+        tokens_per_second: float = 200.0,
+        answer_tokens: int = 40,
+        tool_steps: int = 1,
+        inference_steps: int = 1,
+        name: str = "fake-ollama"
+    ) -> None:
+        """
+        :param port: Port to bind; 0 picks a free one.
+        :param models: Model names reported as installed (and accepted by /api/chat).
+        :param latency: Seconds before the first token of every response.
+        :param tokens_per_second: Generation speed after the first token.
+        :param answer_tokens: Tokens in every free-text answer.
+        :param tool_steps: Tool-use steps in the scripted plan.
+        :param inference_steps: Inference steps in the scripted plan (plus a final wrap-up step).
+        """
+        self.models = models or ["bench-model"]
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.tool_steps = tool_steps
+        self.inference_steps = inference_steps
+        self.name = name
+        self.requests = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self.loaded: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"name": self.name, "requests": self.requests, "max_inflight": self.max_inflight}
+
+    # --- scripted behaviour ---------------------------------------------------
+
+    def _tokens(self, text: str) -> list[str]:
+        # Roughly four characters per token, like typical BPE vocabularies
+        return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+    def _respond(self, body: dict) -> dict:
+        """Decide what the model 'says' for a chat request."""
+        messages = body.get("messages") or []
+        last = messages[-1].get("content", "") if messages else ""
+        schema = body.get("format")
+        words = " ".join(f"token{i}" for i in range(self.answer_tokens))
+        if isinstance(schema, dict) and PLAN_PROMPT_MARKER not in schema.get("properties", {}):
+            # Batched step execution: one answer per requested step_id
+            return {"content": json.dumps({key: f"Stub answer: {words}" for key in schema.get("required", [])})}
+        if PLAN_PROMPT_MARKER in last or schema:
+            question = messages[-1].get("content", "") if messages else ""
+            plan = build_scripted_plan(question[-200:], self.tool_steps, self.inference_steps)
+            return {"content": json.dumps(plan, indent=2)}
+        if body.get("tools"):
+            tool = body["tools"][0]["function"]["name"]
+            return {"content": "", "tool_calls": [{"function": {"name": tool, "arguments": {}}}]}
+        return {"content": f"Stub answer: {words}"}
+
+    def _chunk(self, model: str, content: str, done: bool, tool_calls: Optional[list] = None) -> dict:
+        message: dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        chunk = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": message,
+            "done": done
+        }
+        if done:
+            chunk["done_reason"] = "stop"
+        return chunk
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is exercised
+
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def _send_json(self, payload: dict, status: int = 200) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _write_chunk(self, payload: dict) -> None:
+                data = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _read_body(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [
+                        {
+                            "name": m, "model": m, "size": 4_000_000_000,
+                            "modified_at": "2025-01-01T00:00:00Z", "digest": "0" * 64,
+                            "details": {"format": "gguf", "family": "bench", "parameter_size": "8B", "quantization_level": "Q4_0"}
+                        } for m in server.models
+                    ]})
+                elif self.path == "/api/ps":
+                    with server._lock:
+                        loaded = list(server.loaded)
+                    self._send_json({"models": [
+                        {
+                            "name": m, "model": m, "size": 5_000_000_000, "size_vram": 0,
+                            "digest": "0" * 64, "expires_at": "2099-01-01T00:00:00Z",
+                            "details": {"format": "gguf", "family": "bench"}
+                        } for m in loaded
+                    ]})
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Length", "17")
+                    self.end_headers()
+                    self.wfile.write(b"Ollama is running")
+
+            def do_POST(self):
+                body = self._read_body()
+                model = body.get("model", "")
+                if ":" not in model and f"{model}:latest" in server.models:
+                    model = f"{model}:latest"  # Ollama resolves untagged names to ':latest'
+                if self.path not in ("/api/chat", "/api/generate"):
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+                if model not in server.models:
+                    self._send_json({"error": f"model '{model}' not found"}, status=404)
+                    return
+
+                with server._lock:
+                    server.requests += 1
+                    server.inflight += 1
+                    server.max_inflight = max(server.max_inflight, server.inflight)
+                try:
+                    if self.path == "/api/generate":
+                        self._generate(body, model)
+                    else:
+                        self._chat(body, model)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up on the request (deadline or hedged duplicate)
+                finally:
+                    with server._lock:
+                        server.inflight -= 1
+
+            def _generate(self, body: dict, model: str) -> None:
+                # Only used for preload / unload (empty prompt with keep_alive)
+                with server._lock:
+                    if body.get("keep_alive") in (0, "0", "0s"):
+                        server.loaded.pop(model, None)
+                    else:
+                        server.loaded[model] = time.time()
+                self._send_json({
+                    "model": model, "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": "", "done": True, "done_reason": "load"
+                })
+
+            def _chat(self, body: dict, model: str) -> None:
+                with server._lock:
+                    server.loaded[model] = time.time()
+                reply = server._respond(body)
+                tokens = server._tokens(reply["content"])
+                token_delay = 1.0 / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+                time.sleep(server.latency)
+
+                if not body.get("stream", True):
+                    time.sleep(token_delay * len(tokens))
+                    self._send_json(server._chunk(model, reply["content"], True, reply.get("tool_calls")))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in tokens:
+                    self._write_chunk(server._chunk(model, token, False))
+                    time.sleep(token_delay)
+                self._write_chunk(server._chunk(model, "", True, reply.get("tool_calls")))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server for benchmarks.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", action="append", dest="models", help="Model name to expose (repeatable).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds to first token.")
+    parser.add_argument("--tps", type=float, default=200.0, help="Tokens per second.")
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--tool-steps", type=int, default=1)
+    parser.add_argument("--inference-steps", type=int, default=1)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        port=args.port, models=args.models, latency=args.latency, tokens_per_second=args.tps,
+        answer_tokens=args.answer_tokens, tool_steps=args.tool_steps, inference_steps=args.inference_steps
+    ).start()
+    print(f"Fake Ollama listening on {server.url} (models: {', '.join(server.models)})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+End-to-end benchmark of the reasoning pipeline with a fake Ollama server and a stub MCP tool.
+
+Usage:
+    python -m benchmarks.run_benchmark --sessions 8 --runs 3
+    python -m benchmarks.run_benchmark --driver chat --stream --latency 0.2 --tps 50
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Chat messages that mark the end of each pipeline phase (shared by both drivers)
+MILESTONES = [
+    ("✅ Reasoning prompt generated successfully.", "prompt_ready"),
+    ("🧠 Generating reasoning plan ...", "plan_start"),
+    ("✅ Reasoning plan generated successfully.", "plan_done"),
+    ("✅ Reasoning step", "step_done"),
+    ("🧠 Wrapping up and generating final answer", "final_start"),
+]
+
+# Intervals spent inside the Ollama backend, collected per session
+_model_intervals: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("bench_model_intervals", default=None)
+
+
+def _record_model_interval(start: float, end: float) -> None:
+    intervals = _model_intervals.get()
+    if intervals is not None:
+        intervals.append((start, end))
+
+
+def instrument_backend(backend: Any) -> None:
+    """
+    Time every call that goes through the shared Ollama backend instance.
+    """
+    chat, chat_stream = backend.chat, backend.chat_stream
+
+    async def timed_chat(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await chat(*args, **kwargs)
+        finally:
+            _record_model_interval(start, time.perf_counter())
+
+    async def timed_chat_stream(*args, **kwargs) -> AsyncIterator[Any]:
+        start = time.perf_counter()
+        try:
+            async for chunk in chat_stream(*args, **kwargs):
+                yield chunk
+        finally:
+            _record_model_interval(start, time.perf_counter())
+
+    backend.chat = timed_chat
+    backend.chat_stream = timed_chat_stream
+
+
+def _union_length(intervals: list[tuple[float, float]]) -> float:
+    """Total time covered by possibly overlapping intervals."""
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def prepare_environment(args: argparse.Namespace, ollama_url: str) -> Path:
+    """
+    Write a throwaway config folder (prompt + stub MCP config) and point the app at it.
+    Must run before `core` is imported, since configuration is read at import time.
+    A comma-separated `ollama_url` is balanced over as OLLAMA_HOSTS.
+    """
+    from mcp.client.stdio import get_default_environment
+
+    config_dir = Path(tempfile.mkdtemp(prefix="thinktrace-bench-"))
+    shutil.copy(ROOT / "config" / "simulation_prompt.yml", config_dir / "simulation_prompt.yml")
+    mcp_config = {
+        "mcpServers": {
+            "stub-time-server": {
+                "command": sys.executable,
+                "args": [str(ROOT / "benchmarks" / "stub_mcp_server.py")],
+                "env": {**get_default_environment(), "STUB_TOOL_LATENCY": str(args.tool_latency)}
+            }
+        }
+    }
+    (config_dir / "mcp_config.json").write_text(json.dumps(mcp_config, indent=2), encoding="utf-8")
+
+    os.environ.update({
+        "CONFIG_FOLDER_PATH": str(config_dir),
+        "PROMPT_FILE_NAME": "simulation_prompt.yml",
+        "MCP_CONFIG_FILE_NAME": "mcp_config.json",
+        "OLLAMA_HOST": ollama_url.split(",")[0],
+        "OLLAMA_HOSTS": ollama_url,
+        "ENABLE_STREAMING": "true" if args.stream else "false",
+        "ENABLE_PLAN_CACHE": "true" if args.plan_cache else "false",
+        "EXECUTION_MODE": args.execution_mode,
+        "ENABLE_DIRECT_ANSWER": "true" if args.direct_answer else "false",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+    return config_dir
+
+
+async def _events(args: argparse.Namespace, question: str) -> AsyncIterator[str]:
+    """
+    Drive one run through the selected entry point and yield its chat texts.
+    """
+    if args.driver == "chat":
+        from ui import chat_handler
+        async for chat_messages, _debug_html in chat_handler(question, [], args.model, 40, 0.9, 0.8):
+            yield chat_messages[0]["content"] if chat_messages else ""
+    else:
+        from tools import get_ollama_ai_agent, run_reasoning_pipeline
+        agent = await get_ollama_ai_agent(args.model)
+        async for event in run_reasoning_pipeline(question, agent, 40, 0.9, 0.8):
+            yield event.get("chat", "")
+
+
+async def run_session(args: argparse.Namespace, session_id: int, run_id: int) -> dict:
+    """
+    Run one question and derive per-phase timings from its event stream.
+    """
+    intervals: list = []
+    _model_intervals.set(intervals)
+    marks: dict[str, float] = {}
+    events = 0
+    first_final_token = None
+
+    start = time.perf_counter()
+    async for chat in _events(args, f"Benchmark question {session_id}.{run_id}: what time is it?"):
+        now = time.perf_counter()
+        events += 1
+        marks.setdefault("first_event", now)
+        for prefix, name in MILESTONES:
+            if chat.startswith(prefix):
+                if name == "step_done":
+                    marks[name] = now
+                else:
+                    marks.setdefault(name, now)
+                break
+        else:
+            if "final_start" in marks and first_final_token is None:
+                first_final_token = now
+    end = time.perf_counter()
+    # A final answer derived without a synthesis call is the last event
+    if first_final_token is None:
+        first_final_token = end
+
+    def span(a: str, b: str) -> Optional[float]:
+        return marks[b] - marks[a] if a in marks and b in marks else None
+
+    total = end - start
+    model_busy = _union_length(intervals)
+    return {
+        "session": session_id,
+        "run": run_id,
+        "prompt": span("first_event", "prompt_ready"),
+        "plan": span("plan_start", "plan_done"),
+        "steps": span("plan_done", "step_done"),
+        "final": (end - marks["final_start"]) if "final_start" in marks else None,
+        "ttft_final": (first_final_token - start) if first_final_token else None,
+        "total": total,
+        "model_busy": model_busy,
+        "overhead": total - model_busy,
+        "events": events,
+        "events_per_s": events / total if total > 0 else 0.0,
+    }
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_report(results: list[dict], wall: float, servers: list[FakeOllamaServer]) -> None:
+    print(f"\nRuns: {len(results)}   wall time: {wall:.2f}s   throughput: {len(results) / wall:.2f} runs/s\n")
+    print(f"{'metric':<16}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    for key, unit in [
+        ("prompt", "ms"), ("plan", "ms"), ("steps", "ms"), ("final", "ms"), ("ttft_final", "ms"),
+        ("total", "ms"), ("model_busy", "ms"), ("overhead", "ms"), ("events_per_s", "1/s")
+    ]:
+        values = [r[key] for r in results if r[key] is not None]
+        if not values:
+            continue
+        scale = 1000.0 if unit == "ms" else 1.0
+        cells = [statistics.mean(values), _percentile(values, 50), _percentile(values, 95), max(values)]
+        print(f"{key + ' (' + unit + ')':<16}" + "".join(f"{v * scale:>10.1f}" for v in cells))
+    for server in servers:
+        print(f"\n{server.stats()}")
+
+
+async def run_benchmark(args: argparse.Namespace) -> tuple[list[dict], float]:
+    from tools import mcp_pool_lifespan
+    from tools.ollama_backend import ollama_backend
+
+    instrument_backend(ollama_backend)
+
+    async def session(session_id: int) -> list[dict]:
+        return [await run_session(args, session_id, run_id) for run_id in range(args.runs)]
+
+    async with mcp_pool_lifespan():
+        if args.warmup:
+            await run_session(args, -1, 0)
+        start = time.perf_counter()
+        per_session = await asyncio.gather(*(session(i) for i in range(args.sessions)))
+        wall = time.perf_counter() - start
+    return [r for runs in per_session for r in runs], wall
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the ThinkTrace reasoning pipeline without a GPU.")
+    parser.add_argument("--driver", choices=["pipeline", "chat"], default="pipeline", help="Entry point to drive.")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions.")
+    parser.add_argument("--runs", type=int, default=3, help="Questions per session.")
+    parser.add_argument("--model", default="bench-model")
+    parser.add_argument("--hosts", type=int, default=1, help="Fake Ollama servers to balance over (OLLAMA_HOSTS).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake model time to first token (s).")
+    parser.add_argument("--tps", type=float, default=200.0, help="Fake model tokens per second.")
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--tool-steps", type=int, default=2, help="Tool-use steps in the scripted plan.")
+    parser.add_argument("--inference-steps", type=int, default=2, help="Inference steps in the scripted plan.")
+    parser.add_argument("--tool-latency", type=float, default=0.01, help="Stub MCP tool latency (s).")
+    parser.add_argument("--stream", action="store_true", help="Enable token streaming.")
+    parser.add_argument("--plan-cache", action="store_true", help="Enable the on-disk plan cache.")
+    parser.add_argument("--execution-mode", choices=["per_step", "adaptive"], default="per_step",
+                        help="adaptive batches inference steps that share their dependencies into one call.")
+    parser.add_argument("--no-direct-answer", dest="direct_answer", action="store_false",
+                        help="Always synthesize the final answer with an extra model call.")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip the warm-up run.")
+    parser.add_argument("--json", dest="json_path", help="Also write raw per-run results to this file.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    servers = [FakeOllamaServer(
+        models=[args.model], latency=args.latency, tokens_per_second=args.tps,
+        answer_tokens=args.answer_tokens, tool_steps=args.tool_steps, inference_steps=args.inference_steps,
+        name=f"fake-ollama-{i + 1}" if args.hosts > 1 else "fake-ollama"
+    ).start() for i in range(max(1, args.hosts))]
+    config_dir = prepare_environment(args, ",".join(server.url for server in servers))
+
+    try:
+        results, wall = asyncio.run(run_benchmark(args))
+        print_report(results, wall, servers)
+        if args.json_path:
+            Path(args.json_path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    finally:
+        for server in servers:
+            server.stop()
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import asyncio
+import os
+from datetime import datetime
+import mcp.types as types
+from mcp.server import Server
+from mcp.server.stdio import stdio_server
+
+# Stand-in for tools/mcp_servers/mcp_clock_server.py with a configurable delay
+TOOL_LATENCY = float(os.getenv("STUB_TOOL_LATENCY", "0.01"))
+
+app = Server("stub-time-server", version="1.0.0")
+
+
+@app.list_tools()
+async def list_tools() -> list[types.Tool]:
+    return [
+        types.Tool(
+            name="get_current_time",
+            description="Returns the current time and day of the week",
+            inputSchema={"type": "object", "properties": {}},
+        )
+    ]
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
+    if name == "get_current_time":
+        await asyncio.sleep(TOOL_LATENCY)
+        formatted = datetime.now().strftime("Time: %H:%M:%S\nDay: %A")
+        return [types.TextContent(type="text", text=formatted)]
+    raise ValueError(f"Tool not found: {name}")
+
+
+async def main():
+    async with stdio_server() as (reader, writer):
+        await app.run(reader, writer, app.create_initialization_options())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
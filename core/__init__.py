@@ -1,12 +1,27 @@
 from .logger_manager import logger
-from .config import load_simulation_prompt
+from .config import load_simulation_prompt, get_prompt_template, PromptTemplate
 from .config_manager import SCRIPT_DIR,config_manager
-from .utils import extract_json_from_response
+from .tracing import Trace, Span, span, start_span, start_trace, end_trace, activate, current_trace
+from .deadline import Deadline, DeadlineExceeded, deadline_scope, remaining, wait_within
 
 
 __all__ =   [   "logger",
                 "config_manager",
                 "SCRIPT_DIR",
                 "load_simulation_prompt",
-                "extract_json_from_response"
+                "get_prompt_template",
+                "PromptTemplate",
+                "Trace",
+                "Span",
+                "span",
+                "start_span",
+                "start_trace",
+                "end_trace",
+                "activate",
+                "current_trace",
+                "Deadline",
+                "DeadlineExceeded",
+                "deadline_scope",
+                "remaining",
+                "wait_within"
         ]
\ No newline at end of file
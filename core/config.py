@@ -1,30 +1,25 @@
 import os
+import re
+import hashlib
+import threading
 import yaml
 from typing import Optional
-from core import logger,config_manager
+from core import logger
+from .config_manager import config_manager
 
 
-def load_simulation_prompt(path: Optional[str] = None) -> str:
+def _default_prompt_path() -> str:
+    return config_manager.CONFIG_FOLDER_PATH +"/"+config_manager.PROMPT_FILE_NAME
+
+
+def _read_simulation_prompt(path: str) -> str:
     """
-    Load and return the simulation prompt template from a YAML file.
-    
-    Args:
-        path (str): The path to the YAML file containing the prompt template.
-    
-    Returns:
-        str: The simulation prompt template as a string.
-    
-    Raises:
-        FileNotFoundError: If the YAML file does not exist.
-        ValueError: If the YAML file is malformed or does not contain a 'template' field.
+    Read and parse the prompt YAML file from disk, returning its 'template' field.
     """
-    if path is None:
-        path = config_manager.CONFIG_FOLDER_PATH +"/"+config_manager.PROMPT_FILE_NAME
-    
     if not os.path.exists(path):
         logger.error(f"Prompt file not found at path: {path}")
         raise FileNotFoundError(f"Prompt file not found: {path}")
-    
+
     try:
         with open(path, "r", encoding="utf-8") as f:
             prompt_data = yaml.safe_load(f)
@@ -35,6 +30,131 @@ def load_simulation_prompt(path: Optional[str] = None) -> str:
     if not prompt_data or "template" not in prompt_data:
         logger.error(f"No 'template' key found in the prompt file: {path}")
         raise ValueError(f"Missing 'template' field in prompt YAML: {path}")
-    
+
     logger.debug(f"Successfully loaded simulation prompt from: {path}")
     return prompt_data["template"]
+
+
+class PromptTemplate:
+    """
+    🔹 Compiled simulation prompt template.
+
+    The template is validated once and pre-split around its placeholders, so
+    rendering is a single join. The rendered tool section is cached per tool set.
+    """
+
+    USER_INPUT = "{{ user_input }}"
+    AVAILABLE_TOOLS = "{{ available_tools }}"
+    NO_TOOLS = "No tools available at this time."
+    _PLACEHOLDER_PATTERN = re.compile(r"(\{\{ user_input \}\}|\{\{ available_tools \}\})")
+    _MAX_TOOL_SECTIONS = 32
+
+    def __init__(self, template: str) -> None:
+        if self.USER_INPUT not in template:
+            raise ValueError("Reasoning prompt template missing '{{ user_input }}' placeholder.")
+        if self.AVAILABLE_TOOLS not in template:
+            raise ValueError("Reasoning prompt template missing '{{ available_tools }}' placeholder.")
+
+        self.template = template
+        self.fingerprint = hashlib.sha256(template.encode("utf-8")).hexdigest()
+        self._parts = self._PLACEHOLDER_PATTERN.split(template)
+        self._tool_sections: dict[tuple, str] = {}
+
+    def render_tools(self, tools: list[dict]) -> str:
+        """
+        Render (and cache) the tool section for a list of Ollama tool schemas.
+        """
+        key = tuple(
+            (tool["function"]["name"], tool["function"]["description"])
+            for tool in tools or []
+        )
+        section = self._tool_sections.get(key)
+        if section is None:
+            section = "\n".join(f"{name} : {description}" for name, description in key) or self.NO_TOOLS
+            if len(self._tool_sections) >= self._MAX_TOOL_SECTIONS:
+                self._tool_sections.clear()
+            self._tool_sections[key] = section
+        return section
+
+    def render(self, user_input: str, tools: list[dict]) -> str:
+        """
+        Substitute the user input and the tool section into the template.
+        """
+        values = {self.USER_INPUT: user_input, self.AVAILABLE_TOOLS: self.render_tools(tools)}
+        return "".join(values.get(part, part) for part in self._parts)
+
+
+class _PromptTemplateRegistry:
+    """
+    🔹 Caches prompt templates per file, reloading only when the file's mtime or size changes.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[tuple[int, int], str, Optional[PromptTemplate]]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, path: str) -> tuple[tuple[int, int], str, Optional[PromptTemplate]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(path, None)
+            logger.error(f"Prompt file not found at path: {path}")
+            raise FileNotFoundError(f"Prompt file not found: {path}")
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != version:
+                entry = (version, _read_simulation_prompt(path), None)
+                self._entries[path] = entry
+                logger.info(f"📄 Prompt template (re)loaded from: {path}")
+            return entry
+
+    def get_text(self, path: str) -> str:
+        return self._entry(path)[1]
+
+    def get_template(self, path: str) -> PromptTemplate:
+        version, text, compiled = self._entry(path)
+        if compiled is None:
+            compiled = PromptTemplate(text)
+            with self._lock:
+                if self._entries.get(path, (None,))[0] == version:
+                    self._entries[path] = (version, text, compiled)
+        return compiled
+
+
+_prompt_registry = _PromptTemplateRegistry()
+
+
+def load_simulation_prompt(path: Optional[str] = None) -> str:
+    """
+    Load and return the simulation prompt template from a YAML file.
+    The parsed file is cached and reloaded only when it changes on disk.
+
+    Args:
+        path (str): The path to the YAML file containing the prompt template.
+
+    Returns:
+        str: The simulation prompt template as a string.
+
+    Raises:
+        FileNotFoundError: If the YAML file does not exist.
+        ValueError: If the YAML file is malformed or does not contain a 'template' field.
+    """
+    if path is None:
+        path = _default_prompt_path()
+    return _prompt_registry.get_text(path)
+
+
+def get_prompt_template(path: Optional[str] = None) -> PromptTemplate:
+    """
+    Return the compiled simulation prompt template, validated and ready to render.
+
+    Raises:
+        FileNotFoundError: If the YAML file does not exist.
+        ValueError: If the file is malformed or the template lacks a required placeholder.
+    """
+    if path is None:
+        path = _default_prompt_path()
+    return _prompt_registry.get_template(path)
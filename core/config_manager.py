@@ -27,12 +27,55 @@ class _ConfigManager:
         "LOG_FOLDER_PATH": "logs",
         "CONFIG_FOLDER_PATH" : "",
         "PROMPT_FILE_NAME": "",
-        "MCP_CONFIG_FILE_NAME" : ""
+        "MCP_CONFIG_FILE_NAME" : "",
+        "MAX_PARALLEL_STEPS": "4",
+        "OLLAMA_HOST": "",
+        "OLLAMA_HOSTS": "",
+        "OLLAMA_HOST_RETRY_SECONDS": "5",
+        "OLLAMA_MAX_INFLIGHT_PER_MODEL": "2",
+        "MCP_HEALTH_CHECK_INTERVAL": "30",
+        "MCP_STARTUP_TIMEOUT": "30",
+        "ENABLE_STREAMING": "true",
+        "TOOL_CACHE_MAX_BYTES": "8388608",
+        "ENABLE_PLAN_CACHE": "true",
+        "ENABLE_EARLY_STEPS": "true",
+        "ENABLE_DIRECT_ANSWER": "true",
+        "EXECUTION_MODE": "per_step",  # per_step | adaptive (batch inference steps sharing dependencies)
+        "PLAN_CACHE_PATH": "cache/plan_cache.sqlite",
+        "PLAN_CACHE_MAX_ENTRIES": "500",
+        "DEBUG_MAX_STEPS": "200",
+        "DEBUG_MAX_FIELD_CHARS": "4000",
+        "DEBUG_MAX_PAYLOAD_BYTES": "2097152",
+        "DEBUG_MAX_SESSIONS": "64",
+        "TRACE_EXPORT_PATH": "",
+        "OLLAMA_KEEP_ALIVE": "",
+        "OLLAMA_NUM_CTX": "0",
+        "CONTEXT_TOKEN_BUDGET": "3000",
+        "MODEL_INVENTORY_TTL": "5",
+        "MODEL_RAM_BUDGET_MB": "0",
+        "PLAN_MAX_REPAIRS": "1",
+        "ADMISSION_MAX_ACTIVE_PER_MODEL": "4",
+        "ADMISSION_MAX_QUEUE": "16",
+        "PIPELINE_TIMEOUT": "900",
+        "PLAN_TIMEOUT": "300",
+        "STEP_TIMEOUT": "300",
+        "FINAL_TIMEOUT": "300",
+        "HEDGE_AFTER_MS": "0",
+        "HEDGE_MODEL": ""
         
          }
 
     # 🔹 Keys to be interpreted as booleans
-    _BOOLEAN_KEYS = {"ENABLE_FILE_LOGGING"}
+    _BOOLEAN_KEYS = {"ENABLE_FILE_LOGGING", "ENABLE_STREAMING", "ENABLE_PLAN_CACHE", "ENABLE_EARLY_STEPS",
+                     "ENABLE_DIRECT_ANSWER"}
+
+    # 🔹 Keys to be interpreted as integers
+    _INTEGER_KEYS = {"MAX_PARALLEL_STEPS", "OLLAMA_MAX_INFLIGHT_PER_MODEL", "MCP_HEALTH_CHECK_INTERVAL", "MCP_STARTUP_TIMEOUT", "TOOL_CACHE_MAX_BYTES", "PLAN_CACHE_MAX_ENTRIES",
+                     "DEBUG_MAX_STEPS", "DEBUG_MAX_FIELD_CHARS", "DEBUG_MAX_PAYLOAD_BYTES", "DEBUG_MAX_SESSIONS",
+                     "OLLAMA_NUM_CTX", "CONTEXT_TOKEN_BUDGET", "MODEL_INVENTORY_TTL",
+                     "MODEL_RAM_BUDGET_MB", "PLAN_MAX_REPAIRS", "OLLAMA_HOST_RETRY_SECONDS",
+                     "ADMISSION_MAX_ACTIVE_PER_MODEL", "ADMISSION_MAX_QUEUE",
+                     "PIPELINE_TIMEOUT", "PLAN_TIMEOUT", "STEP_TIMEOUT", "FINAL_TIMEOUT", "HEDGE_AFTER_MS"}
 
 
     def __new__(cls):
@@ -62,9 +105,15 @@ class _ConfigManager:
         """
         🔹 Converts configuration values to the appropriate type.
         Booleans are recognized from strings (e.g., 'true', 'false').
+        Integers are parsed from their string form (e.g., '4').
         """
         if key in _ConfigManager._BOOLEAN_KEYS:
             return value.lower() == "true" if isinstance(value, str) else bool(value)
+        if key in _ConfigManager._INTEGER_KEYS:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"❌ Configuration key '{key}' must be an integer, got: {value!r}")
         return value  # Return as-is for non-boolean keys
 
     def __getattr__(self, name):
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a call doesn't finish within the time left to its run or phase.
+    """
+
+
+# Absolute time.monotonic() by which the current work must be done (None: no deadline)
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class Deadline:
+    """
+    🔹 Deadline: A point in time a piece of work must finish by.
+
+    Responsibilities:
+    - Turn a timeout in seconds into an absolute deadline.
+    - Give the budget of a sub-call: its own timeout capped by what's left.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        """
+        :param timeout: Seconds from now; None or <= 0 means no deadline.
+        """
+        self.expires_at = time.monotonic() + timeout if timeout and timeout > 0 else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Timeout for a sub-call: `timeout` (None or <= 0 for none) capped by the time left.
+        """
+        return _shortest(timeout if timeout and timeout > 0 else None, self.remaining())
+
+
+def _shortest(*timeouts: Optional[float]) -> Optional[float]:
+    values = [t for t in timeouts if t is not None]
+    return min(values) if values else None
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the deadline of the current context, or None.
+    """
+    expires_at = _deadline.get()
+    return None if expires_at is None else max(0.0, expires_at - time.monotonic())
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Narrow the deadline of the current context to `timeout` seconds from now
+    (never extends it). Tasks created inside inherit it.
+
+    Don't use across `yield` in async generators: use a Deadline object there.
+    """
+    budget = _shortest(timeout, remaining())
+    token = _deadline.set(None if budget is None else time.monotonic() + budget)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def wait_within(awaitable: Awaitable[Any], timeout: Optional[float] = None, what: str = "call") -> Any:
+    """
+    Await `awaitable` within `timeout` and the current context's deadline.
+
+    :raises DeadlineExceeded: When the time runs out (the awaitable is cancelled).
+    """
+    budget = _shortest(timeout, remaining())
+    if budget is None:
+        return await awaitable
+    # Cancels in place (no extra task), so it can guard a single read of a stream
+    scope = asyncio.timeout(budget)
+    try:
+        async with scope:
+            return await awaitable
+    except TimeoutError as e:
+        if not scope.expired():
+            raise
+        raise DeadlineExceeded(f"{what} did not finish within {budget:.1f}s") from e
@@ -0,0 +1,235 @@
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+from .logger_manager import logger
+
+
+@dataclass
+class Span:
+    """
+    🔹 A timed operation inside a trace (prompt rendering, an LLM call, a tool call...).
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _trace: Optional["Trace"] = field(default=None, repr=False)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Close the span (idempotent)."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self._trace is not None:
+            self._trace._finished(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "attributes": self.attributes,
+            **({"error": self.error} if self.error else {})
+        }
+
+    def to_otlp(self) -> dict:
+        """Encode as an OTLP/JSON span."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Trace:
+    """
+    🔹 Trace: Collects the spans of one pipeline run.
+
+    Responsibilities:
+    - Create spans with parent links under a single trace id.
+    - Hand out spans finished since the last call (to attach them to debug events).
+    - Summarize time per span name and export in OpenTelemetry (OTLP/JSON) format.
+    """
+
+    def __init__(self, name: str, **attributes: Any) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self._pending: list[Span] = []
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, parent=None, **attributes)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+            _trace=self
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def _finished(self, span: Span) -> None:
+        with self._lock:
+            self._pending.append(span)
+
+    def drain(self) -> list[dict]:
+        """Return spans finished since the previous call, oldest first."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return [span.to_dict() for span in sorted(pending, key=lambda s: s.start_ns)]
+
+    def finish(self) -> None:
+        """End every span still open, then the root span."""
+        for span in list(self.spans):
+            if span is not self.root:
+                span.end()
+        self.root.end()
+
+    def summary(self) -> dict:
+        """Total run time plus count / total / max duration per span name."""
+        by_name: dict[str, dict] = {}
+        for span in self.spans:
+            if span is self.root or span.duration_ms is None:
+                continue
+            entry = by_name.setdefault(span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + span.duration_ms, 3)
+            entry["max_ms"] = round(max(entry["max_ms"], span.duration_ms), 3)
+        slowest = sorted(
+            (s for s in self.spans if s is not self.root and s.duration_ms is not None),
+            key=lambda s: s.duration_ms,
+            reverse=True
+        )[:5]
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.root.duration_ms or 0.0, 3),
+            "by_name": by_name,
+            "slowest": [{"name": s.name, "duration_ms": round(s.duration_ms, 3), **s.attributes} for s in slowest]
+        }
+
+    def to_otlp(self, service_name: str = "thinktrace") -> dict:
+        """Encode the trace as an OTLP/JSON ExportTraceServiceRequest."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "thinktrace.pipeline"},
+                    "spans": [span.to_otlp() for span in self.spans]
+                }]
+            }]
+        }
+
+    def export(self, path: str, service_name: str = "thinktrace") -> None:
+        """Append the trace as one JSON line to `path`."""
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.to_otlp(service_name)) + "\n")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to export trace to {path}: {e}")
+
+
+_active_trace: ContextVar[Optional[Trace]] = ContextVar("thinktrace_active_trace", default=None)
+_active_span: ContextVar[Optional[Span]] = ContextVar("thinktrace_active_span", default=None)
+
+
+def start_trace(name: str, **attributes: Any) -> Trace:
+    """Start a trace and make its root span the active span."""
+    trace = Trace(name, **attributes)
+    _active_trace.set(trace)
+    _active_span.set(trace.root)
+    return trace
+
+
+def end_trace(trace: Trace) -> None:
+    """Finish a trace and detach it from the current context."""
+    trace.finish()
+    if _active_trace.get() is trace:
+        _active_trace.set(None)
+        _active_span.set(None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _active_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    return _active_span.get()
+
+
+def activate(span: Optional[Span]) -> None:
+    """Make `span` the parent of spans opened from now on in this context."""
+    _active_span.set(span)
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """Open a child of the active span without activating it (None outside a trace)."""
+    trace = _active_trace.get()
+    if trace is None:
+        return None
+    return trace.start_span(name, parent=_active_span.get() or trace.root, **attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the active span. A no-op outside a trace.
+    The previous active span is restored with `set` rather than a token reset,
+    so the block may also be entered from an async generator.
+    """
+    child = start_span(name, **attributes)
+    if child is None:
+        yield None
+        return
+
+    previous = _active_span.get()
+    _active_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.end(error=e)
+        raise
+    finally:
+        child.end()
+        _active_span.set(previous)
@@ -1,5 +1,6 @@
 import gradio as gr
-from ui import ollama_settings, prompt_settings,chat_handler,debug_output
+from ui import ollama_settings, prompt_settings,chat_handler,debug_output,debug_payload_viewer
+from tools import mcp_pool_lifespan
 with gr.Blocks() as demo:
     gr.HTML("""
         <style>
@@ -70,5 +71,7 @@ with gr.Blocks() as demo:
     with gr.Tab("Debug"):
         with gr.Accordion("🧩 Reasoning Steps", open=True):
             debug_output.render()
+        debug_payload_viewer()
         
-demo.queue().launch(debug=True)
+# Concurrency per model is bounded by the admission controller (ADMISSION_MAX_ACTIVE_PER_MODEL)
+demo.queue(default_concurrency_limit=None).launch(debug=True, app_kwargs={"lifespan": mcp_pool_lifespan})
@@ -1,11 +1,16 @@
-from .ollama_manager import run_model, stop_model,list_models_with_status
-from .ollama_mcp_client import get_ollama_ai_agent
+from .ollama_manager import run_model, stop_model,list_models_with_status, residency_manager
+from .ollama_mcp_client import get_ollama_ai_agent, mcp_pool_lifespan
 from .reasoning_engine import run_reasoning_pipeline
+from .admission import admission_controller, AdmissionRejected
 
 __all__ =   [   
                 "run_model",
                 "stop_model",
                 "list_models_with_status",
+                "residency_manager",
                 "run_reasoning_pipeline",
                 "get_ollama_ai_agent",
+                "mcp_pool_lifespan",
+                "admission_controller",
+                "AdmissionRejected",
             ]
\ No newline at end of file
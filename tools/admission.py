@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List
+from core import logger, config_manager
+from .ollama_backend import normalize_model_name
+
+# Lower runs first; interactive chats go ahead of batch runs
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Batch runners bound their own concurrency and would rather wait than fail
+NEVER_REJECTED = {"batch"}
+
+
+class AdmissionRejected(RuntimeError):
+    """
+    Raised when a run can't even be queued because the wait queue of its model is full.
+    """
+
+
+@dataclass
+class AdmissionTicket:
+    """
+    A run waiting for, or holding, one of its model's slots.
+    """
+    model: str
+    priority: str
+    seq: int
+    granted: bool = False
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def rank(self) -> tuple:
+        return PRIORITIES[self.priority], self.seq
+
+
+class AdmissionController:
+    """
+    🔹 AdmissionController: Decides when a reasoning run may start.
+
+    Responsibilities:
+    - Limit how many runs use the same model at once.
+    - Queue the others by priority class, then arrival order.
+    - Reject runs right away (busy) instead of growing the queue without bound.
+    - Let waiting runs follow their position in the queue.
+    """
+
+    def __init__(self, max_active_per_model: int = 4, max_queue: int = 16) -> None:
+        """
+        :param max_active_per_model: Runs allowed to use the same model at once (0 disables admission control).
+        :param max_queue: Runs allowed to wait ahead of a new one before it is rejected.
+        """
+        self.max_active_per_model = max_active_per_model
+        self.max_queue = max_queue
+        self._active: Dict[str, int] = {}
+        self._queues: Dict[str, List[AdmissionTicket]] = {}
+        self._seq = itertools.count()
+
+    def _notify(self, key: str) -> None:
+        for ticket in self._queues.get(key, []):
+            ticket.changed.set()
+
+    def _grant_next(self, key: str) -> None:
+        queue = self._queues.get(key, [])
+        while queue and self._active.get(key, 0) < self.max_active_per_model:
+            ticket = queue.pop(0)
+            ticket.granted = True
+            ticket.changed.set()
+            self._active[key] = self._active.get(key, 0) + 1
+        self._notify(key)
+
+    def enqueue(self, model: str, priority: str = "interactive") -> AdmissionTicket:
+        """
+        Take a slot for `model`, or a place in its queue.
+
+        :raises AdmissionRejected: When more than max_queue runs would wait ahead of this one.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class '{priority}', expected one of {list(PRIORITIES)}.")
+        key = normalize_model_name(model)
+        ticket = AdmissionTicket(model=key, priority=priority, seq=next(self._seq))
+        if self.max_active_per_model <= 0:
+            ticket.granted = True
+            return ticket
+
+        queue = self._queues.setdefault(key, [])
+        if not queue and self._active.get(key, 0) < self.max_active_per_model:
+            ticket.granted = True
+            self._active[key] = self._active.get(key, 0) + 1
+            return ticket
+
+        ahead = sum(1 for t in queue if t.rank < ticket.rank)
+        if ahead >= self.max_queue and priority not in NEVER_REJECTED:
+            logger.warning(f"🚦 Rejecting {priority} run for '{model}': {ahead} runs already waiting.")
+            raise AdmissionRejected(f"The model '{model}' is busy ({ahead} requests waiting). Please try again shortly.")
+
+        queue.insert(ahead, ticket)
+        self._notify(key)
+        return ticket
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        """
+        1-based position of a waiting ticket in its model's queue (0 once granted).
+        """
+        if ticket.granted:
+            return 0
+        return self._queues.get(ticket.model, []).index(ticket) + 1
+
+    async def wait(self, ticket: AdmissionTicket) -> AsyncIterator[int]:
+        """
+        Yield the ticket's queue position every time it changes, until it is granted.
+        """
+        last = None
+        while not ticket.granted:
+            position = self.position(ticket)
+            if position != last:
+                last = position
+                yield position
+            await ticket.changed.wait()
+            ticket.changed.clear()
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        """
+        Give back the ticket's slot, or leave the queue if it was still waiting.
+        """
+        if self.max_active_per_model <= 0:
+            return
+        key = ticket.model
+        if ticket.granted:
+            self._active[key] = max(0, self._active.get(key, 0) - 1)
+        elif ticket in self._queues.get(key, []):
+            self._queues[key].remove(ticket)
+        self._grant_next(key)
+
+    @asynccontextmanager
+    async def ticket(self, model: str, priority: str = "interactive") -> AsyncIterator[AdmissionTicket]:
+        """
+        Enqueue for `model` and release the ticket on exit, whether or not it was granted.
+        Iterate `wait(ticket)` inside the block to wait for the slot.
+        """
+        ticket = self.enqueue(model, priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            key: {"active": self._active.get(key, 0), "queued": len(self._queues.get(key, []))}
+            for key in sorted(set(self._active) | set(self._queues))
+        }
+
+
+# ✅ Shared admission controller for chat sessions and batch runs
+admission_controller = AdmissionController(
+    max_active_per_model=config_manager.ADMISSION_MAX_ACTIVE_PER_MODEL,
+    max_queue=config_manager.ADMISSION_MAX_QUEUE
+)
@@ -0,0 +1,228 @@
+"""
+Headless batch runner: answer every question of a JSONL file with the reasoning pipeline.
+
+Usage:
+    python -m tools.batch_runner questions.jsonl -o answers.jsonl --model mistral-nemo --concurrency 4
+
+Each input line is a JSON object holding the question (field "question" by default)
+and optionally an id ("id" or "request_id"; the line number otherwise). One result
+line is appended to the output file as soon as each question finishes; rerunning
+with the same output file skips questions that already completed successfully.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+from core import logger, config_manager
+from .ollama_mcp_client import get_ollama_ai_agent, mcp_pool_lifespan
+from .reasoning_engine import run_reasoning_pipeline
+from .admission import admission_controller
+
+ID_FIELDS = ("id", "request_id")
+
+
+def read_completed_ids(output_path: Path) -> set[str]:
+    """
+    Ids already answered successfully in an existing output file.
+    A truncated last line (interrupted write) is ignored.
+    """
+    completed: set[str] = set()
+    if not output_path.exists():
+        return completed
+    with output_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                completed.add(str(record.get("id")))
+    return completed
+
+
+async def iter_questions(input_path: Path, question_field: str, id_field: Optional[str]) -> AsyncIterator[dict]:
+    """
+    Stream {"id", "question"} items from the input file without loading it whole.
+    """
+    fields = (id_field,) if id_field else ID_FIELDS
+    with input_path.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ Skipping invalid JSON on line {line_number}: {e}")
+                continue
+            question = record.get(question_field)
+            if not question:
+                logger.warning(f"⚠️ Skipping line {line_number}: no '{question_field}' field")
+                continue
+            item_id = next((record[f] for f in fields if record.get(f) is not None), line_number)
+            yield {"id": str(item_id), "question": question}
+
+
+class BatchRunner:
+    """
+    🔹 BatchRunner: Runs the reasoning pipeline over a stream of questions.
+
+    Responsibilities:
+    - Feed questions to a fixed number of workers through a bounded queue.
+    - Share one agent (and the process-wide MCP server pool) between workers.
+    - Append each result with its timing to the output file as soon as it's ready.
+    - Skip questions already completed in the output file (resume).
+    """
+
+    def __init__(
+        self,
+        agent: Any,
+        output_path: Path,
+        concurrency: int = 4,
+        sampling: Optional[dict] = None,
+        max_parallel_steps: Optional[int] = None
+    ) -> None:
+        """
+        :param agent: OllamaAgent shared by every run.
+        :param output_path: JSONL file results are appended to.
+        :param concurrency: Number of questions processed at the same time.
+        :param sampling: top_k / top_p / temperature passed to the pipeline.
+        :param max_parallel_steps: Per-run step concurrency (defaults to MAX_PARALLEL_STEPS).
+        """
+        self.agent = agent
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.sampling = sampling or {"top_k": 40, "top_p": 0.9, "temperature": 0.8}
+        self.max_parallel_steps = max_parallel_steps
+        self._write_lock = asyncio.Lock()
+        self.counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    async def run_one(self, item: dict) -> dict:
+        """
+        Run the pipeline for one question and build its result record.
+        """
+        record: dict[str, Any] = {
+            "id": item["id"],
+            "question": item["question"],
+            "status": "ok",
+            "started_at": datetime.now(timezone.utc).isoformat()
+        }
+        start = time.perf_counter()
+        events = 0
+        try:
+            # Batch runs yield to interactive chats sharing the model
+            async with admission_controller.ticket(self.agent.model, priority="batch") as ticket:
+                async for _ in admission_controller.wait(ticket):
+                    pass
+                record["queued_s"] = round(time.perf_counter() - start, 3)
+                async for event in run_reasoning_pipeline(
+                    item["question"], self.agent, max_parallel_steps=self.max_parallel_steps, stream=False, **self.sampling
+                ):
+                    events += 1
+                    debug = event.get("debug") or {}
+                    if debug.get("css_class") == "error-step" or debug.get("step") == "fatal":
+                        record["status"] = "error"
+                        record["error"] = debug.get("error", event.get("chat"))
+                    if "reasoning" in debug:
+                        record["plan"] = debug["reasoning"]
+                    if "final_answer" in debug:
+                        record["answer"] = debug["final_answer"]
+                    if "timing" in debug:
+                        record["timing"] = debug["timing"]
+        except Exception as e:
+            logger.exception(f"❌ Batch item {item['id']} failed")
+            record["status"] = "error"
+            record["error"] = str(e)
+        record["duration_s"] = round(time.perf_counter() - start, 3)
+        record["events"] = events
+        return record
+
+    async def _write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        async with self._write_lock:
+            with self.output_path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                record = await self.run_one(item)
+                await self._write(record)
+                self.counts[record["status"]] += 1
+                logger.info(f"{'✅' if record['status'] == 'ok' else '❌'} [{item['id']}] done in {record['duration_s']}s")
+            finally:
+                queue.task_done()
+
+    async def run(self, items: AsyncIterator[dict]) -> dict:
+        """
+        Process every item not already completed in the output file.
+
+        :return: Counts of ok, error and skipped items.
+        """
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        completed = read_completed_ids(self.output_path)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            async for item in items:
+                if item["id"] in completed:
+                    self.counts["skipped"] += 1
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return self.counts
+
+
+async def run_batch(args: argparse.Namespace) -> dict:
+    async with mcp_pool_lifespan():
+        agent = await get_ollama_ai_agent(args.model)
+        runner = BatchRunner(
+            agent,
+            output_path=Path(args.output),
+            concurrency=args.concurrency,
+            sampling={"top_k": args.top_k, "top_p": args.top_p, "temperature": args.temperature},
+            max_parallel_steps=args.max_parallel_steps
+        )
+        return await runner.run(iter_questions(Path(args.input), args.question_field, args.id_field))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the ThinkTrace reasoning pipeline over a JSONL file of questions.")
+    parser.add_argument("input", help="Input JSONL file, one question per line.")
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL file (appended to; enables resume).")
+    parser.add_argument("--model", default="mistral-nemo", help="Ollama model to use.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions processed at the same time.")
+    parser.add_argument("--question-field", default="question", help="Input field holding the question.")
+    parser.add_argument("--id-field", default=None, help="Input field holding the item id (default: id or request_id).")
+    parser.add_argument("--top-k", type=int, default=40)
+    parser.add_argument("--top-p", type=float, default=0.9)
+    parser.add_argument("--temperature", type=float, default=0.8)
+    parser.add_argument("--max-parallel-steps", type=int, default=None,
+                        help=f"Steps run in parallel within one question (default: {config_manager.MAX_PARALLEL_STEPS}).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    start = time.perf_counter()
+    counts = asyncio.run(run_batch(args))
+    logger.info(
+        f"🏁 Batch finished in {time.perf_counter() - start:.1f}s: "
+        f"{counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped (already done)."
+    )
+
+
+if __name__ == "__main__":
+    main()
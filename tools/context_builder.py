@@ -0,0 +1,124 @@
+import json
+import math
+from typing import Any, Iterable, Tuple
+from core import config_manager
+
+# Rough average for BPE vocabularies; good enough to budget prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of tokens in `text`."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _content_text(content: Any) -> str | None:
+    """Join the text blocks of an MCP `content` list, if that's what `content` is."""
+    if not isinstance(content, list):
+        return None
+    texts = [
+        item.get("text", "") for item in content
+        if isinstance(item, dict) and item.get("type", "text") == "text"
+    ]
+    return "\n".join(t for t in texts if t) if texts else None
+
+
+def extract_text(result: Any) -> str:
+    """
+    Reduce a serialized step result to the text worth showing the model:
+    the answer of an inference step, or the output text of each tool call
+    (without raw payloads, descriptions or other metadata).
+    """
+    if result is None:
+        return ""
+    if isinstance(result, str):
+        return result.strip()
+    if isinstance(result, dict):
+        if "calls" in result:  # several tool calls aggregated by OllamaAgent.run
+            return "\n\n".join(f"[{call.get('tool_name')}]\n{extract_text(call)}" for call in result["calls"])
+        if "raw_output" in result:  # format_tool_result
+            raw = result["raw_output"]
+            text = _content_text(raw.get("content")) if isinstance(raw, dict) else None
+            return (text if text is not None else str(result.get("output_text", ""))).strip()
+        text = _content_text(result.get("content"))  # bare MCP CallToolResult
+        if text is not None:
+            return text.strip()
+        if "result" in result:  # error returned by OllamaAgent.run
+            return str(result["result"]).strip()
+    try:
+        return json.dumps(result, ensure_ascii=False, default=str)
+    except Exception:
+        return str(result)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Keep the start and end of `text` within `max_tokens`, marking the cut."""
+    omitted = estimate_tokens(text) - max_tokens
+    marker = f"\n[... ~{omitted} tokens omitted ...]\n"
+    keep = max(0, max_tokens * CHARS_PER_TOKEN - len(marker))
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+class ContextBuilder:
+    """
+    🔹 ContextBuilder: Assembles the context block of step and final-answer prompts.
+
+    Responsibilities:
+    - Keep only the useful text of each step result.
+    - Fit the block into a per-call token budget, splitting it fairly between
+      results and truncating the largest ones (keeping their start and end).
+    - Report how many tokens were saved compared to the raw serialized results.
+    """
+
+    def __init__(self, token_budget: int = 3000) -> None:
+        """
+        :param token_budget: Maximum estimated tokens of one context block (0 disables the limit).
+        """
+        self.token_budget = token_budget
+
+    def _allocate(self, sizes: list[int], budget: int) -> list[int]:
+        """Water-filling: small entries are kept whole, the rest share what remains equally."""
+        allocation = [0] * len(sizes)
+        remaining = budget
+        order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+        for rank, i in enumerate(order):
+            share = remaining // (len(sizes) - rank)
+            allocation[i] = min(sizes[i], share)
+            remaining -= allocation[i]
+        return allocation
+
+    def build(self, entries: Iterable[Tuple[str, Any]]) -> Tuple[str, dict]:
+        """
+        Build a context block from (label, result) pairs.
+
+        :return: The context text and stats: tokens, raw_tokens, saved_tokens, truncated.
+        """
+        entries = list(entries)
+        raw_tokens = estimate_tokens(json.dumps([r for _, r in entries], ensure_ascii=False, default=str)) if entries else 0
+        headers = [f"### {label}\n" if label else "" for label, _ in entries]
+        texts = [extract_text(result) or "(no output)" for _, result in entries]
+
+        sizes = [estimate_tokens(t) for t in texts]
+        truncated = 0
+        if self.token_budget > 0 and sum(sizes) + sum(estimate_tokens(h) for h in headers) > self.token_budget:
+            budget = max(0, self.token_budget - sum(estimate_tokens(h) for h in headers))
+            for i, limit in enumerate(self._allocate(sizes, budget)):
+                if limit < sizes[i]:
+                    texts[i] = _truncate(texts[i], limit)
+                    truncated += 1
+
+        context = "\n\n".join(h + t for h, t in zip(headers, texts))
+        tokens = estimate_tokens(context)
+        return context, {
+            "tokens": tokens,
+            "raw_tokens": raw_tokens,
+            "saved_tokens": max(0, raw_tokens - tokens),
+            "truncated": truncated,
+            "budget": self.token_budget
+        }
+
+
+# ✅ Shared context builder
+context_builder = ContextBuilder(token_budget=config_manager.CONTEXT_TOKEN_BUDGET)
@@ -0,0 +1,52 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+from .context_builder import extract_text
+
+# Placeholder a plan's final_output_format can use to reference a step result
+STEP_PLACEHOLDER = re.compile(r"\{\{\s*step_(\d+)\s*\}\}")
+
+
+def _is_failed(result: Any) -> bool:
+    """Tool errors and errors returned by OllamaAgent.run are never an answer."""
+    if not isinstance(result, dict):
+        return False
+    return bool(result.get("isError")) or ("result" in result and result.get("tool", "") is None)
+
+
+def render_output_template(template: str, results: Dict[Any, Any]) -> Optional[str]:
+    """
+    Fill `{{ step_N }}` placeholders with step results.
+    None when the template has no placeholder or references a missing or failed step.
+    """
+    step_ids = [int(match) for match in STEP_PLACEHOLDER.findall(template or "")]
+    if not step_ids or any(step_id not in results or _is_failed(results[step_id]) for step_id in step_ids):
+        return None
+    rendered = STEP_PLACEHOLDER.sub(lambda m: extract_text(results[int(m.group(1))]), template)
+    return rendered.strip() or None
+
+
+def derive_final_answer(plan: dict, results: Dict[Any, Any]) -> Optional[Tuple[str, str]]:
+    """
+    Final answer that can be given without a synthesis call, if any.
+
+    Strategies, in order:
+    - template: the plan's final_output_format references step results as `{{ step_N }}`.
+    - single_step: the plan is a single step, whose result already is the answer.
+
+    Steps of longer plans only see their direct dependencies and are prompted to
+    produce context for later steps, so their results are never used as the answer.
+
+    :return: (strategy, answer), or None when the answer must be synthesized.
+    """
+    answer = render_output_template(plan.get("final_output_format", ""), results)
+    if answer:
+        return "template", answer
+
+    steps = plan.get("reasoning_steps") or []
+    if len(steps) != 1 or steps[0]["step_id"] not in results:
+        return None
+    result = results[steps[0]["step_id"]]
+    if _is_failed(result):
+        return None
+    answer = extract_text(result)
+    return ("single_step", answer) if answer else None
@@ -1,5 +1,6 @@
+import asyncio
 import json
-from typing import Any, List, Callable, Generic, Type
+from typing import Any, Dict, List, Callable, Generic, Optional, Type
 from contextlib import AsyncExitStack
 from pathlib import Path
 from core import logger
@@ -12,7 +13,8 @@ class MCPClient(Generic[ToolType]):
     
     Responsibilities:
     - Load configuration from JSON.
-    - Create and initialize each MCPServer.
+    - Create and initialize the MCPServers concurrently.
+    - Keep the tools of the servers that came up when others fail (degraded servers).
     - Aggregate and expose all tool instances.
     - Handle cleanup of all resources.
     """
@@ -20,16 +22,22 @@ class MCPClient(Generic[ToolType]):
     def __init__(
         self,
         server_class: Type[MCPServer[ToolType]],
-        tool_wrapper: Callable[[Any, Any], ToolType]
+        tool_wrapper: Callable[[Any, Any], ToolType],
+        tool_remover: Optional[Callable[[Any, ToolType], None]] = None
     ) -> None:
         """
         :param server_class: Class reference to your MCPServer implementation.
         :param tool_wrapper: Function to wrap a tool definition (e.g. schema, method).
+        :param tool_remover: Function undoing what tool_wrapper registered, called with
+            (MCPServer, tool) for the tools of a server that went down.
         """
         self.server_class = server_class
         self.tool_wrapper = tool_wrapper
+        self.tool_remover = tool_remover
         self.servers: List[MCPServer[ToolType]] = []
         self.config: dict[str, Any] = {}
+        self.tools_by_server: Dict[str, List[ToolType]] = {}
+        self.failed: Dict[str, str] = {}  # degraded server name → reason
         self.exit_stack = AsyncExitStack()
 
     def load_servers(self) -> None:
@@ -62,25 +70,51 @@ class MCPClient(Generic[ToolType]):
 
     async def start(self) -> List[ToolType]:
         """
-        Start all loaded MCP servers and return a combined list of their tools.
-        
+        Start all loaded MCP servers concurrently and return a combined list of their tools.
+        A server that fails or exceeds its startup timeout is cleaned up and listed in
+        `failed`; the others keep their tools.
+
         :return: List of tools across all initialized servers.
         """
-        all_tools: List[ToolType] = []
+        await asyncio.gather(*(self._start_isolated(server) for server in self.servers))
 
-        for server in self.servers:
-            try:
-                await server.initialize()
-                tools = await server.create_tools()
-                all_tools.extend(tools)
-            except Exception as e:
-                logger.error(f"❌ Failed to start server '{server.name}': {e}")
-                await self.cleanup()
-                return []
-
-        logger.info(f"✅ Started {len(self.servers)} server(s), loaded {len(all_tools)} tool(s).")
+        if self.failed:
+            logger.warning(f"⚠️ {len(self.failed)} MCP server(s) degraded: {', '.join(self.failed)}")
+        all_tools = self.tools
+        logger.info(f"✅ Started {len(self.servers) - len(self.failed)}/{len(self.servers)} server(s), loaded {len(all_tools)} tool(s).")
         return all_tools
 
+    async def _start_isolated(self, server: MCPServer[ToolType]) -> None:
+        try:
+            await self.start_server(server)
+        except Exception as e:
+            logger.error(f"❌ Failed to start server '{server.name}': {e}")
+
+    async def start_server(self, server: MCPServer[ToolType]) -> List[ToolType]:
+        """
+        Start (or retry) one server and record its tools, or why it failed.
+
+        :raises RuntimeError: When the server can't be started or its tools can't be listed.
+        """
+        try:
+            await server.initialize()
+            tools = await server.create_tools()
+        except Exception as e:
+            self.failed[server.name] = str(e)
+            for tool in self.tools_by_server.pop(server.name, []):
+                if self.tool_remover is not None:
+                    self.tool_remover(server, tool)
+            await server.cleanup()
+            raise
+        self.failed.pop(server.name, None)
+        self.tools_by_server[server.name] = tools
+        return tools
+
+    @property
+    def tools(self) -> List[ToolType]:
+        """Tools of the servers that are up, in config order."""
+        return [tool for server in self.servers for tool in self.tools_by_server.get(server.name, [])]
+
     async def cleanup(self) -> None:
         """
         Clean up all server resources and exit stack.
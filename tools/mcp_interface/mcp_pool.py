@@ -0,0 +1,159 @@
+import asyncio
+from typing import Any, Callable, Dict, Generic, List, Optional, Type
+from core import logger
+from .mcp_server import MCPServer, ToolType
+from .mcp_client import MCPClient
+
+
+class MCPServerPool(Generic[ToolType]):
+    """
+    🔹 MCPServerPool: Process-wide pool of long-lived MCP servers.
+
+    Responsibilities:
+    - Start every configured server once, on first use, and share the sessions
+      across all concurrent chats.
+    - Serve the tools of the servers that came up when others fail to start.
+    - Periodically health-check the servers, restart crashed ones and retry
+      degraded ones (those that failed to start) in the background.
+    - Shut everything down only when the application exits.
+    """
+
+    def __init__(
+        self,
+        server_class: Type[MCPServer[ToolType]],
+        tool_wrapper: Callable[[MCPServer, Any], ToolType],
+        tool_remover: Optional[Callable[[MCPServer, ToolType], None]] = None,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0
+    ) -> None:
+        """
+        :param server_class: Class reference to your MCPServer implementation.
+        :param tool_wrapper: Function to wrap a tool definition (e.g. schema, method).
+        :param tool_remover: Function unregistering a wrapped tool of a server that went down.
+        :param health_check_interval: Seconds between background health checks (0 disables them).
+        :param ping_timeout: Seconds a server has to answer a health-check ping.
+        """
+        self.server_class = server_class
+        self.tool_wrapper = tool_wrapper
+        self.tool_remover = tool_remover
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.client: Optional[MCPClient[ToolType]] = None
+        self.tools: List[ToolType] = []
+        self._start_task: Optional[asyncio.Task] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._restart_lock = asyncio.Lock()
+
+    async def get_tools(self) -> List[ToolType]:
+        """
+        Return the shared tool list, starting the pool on first use.
+        Dead servers are restarted before returning.
+        """
+        if self._start_task is None:
+            self._start_task = asyncio.create_task(self._start())
+
+        try:
+            # Shielded so a cancelled chat does not abort a startup other chats are waiting on
+            await asyncio.shield(self._start_task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ MCP server pool failed to start: {e}")
+            self._start_task = None
+            return []
+
+        await self._restart_dead_servers()
+        return self.tools
+
+    @property
+    def degraded(self) -> Dict[str, str]:
+        """
+        Servers that failed to start and are being retried in the background (name → reason).
+        """
+        return dict(self.client.failed) if self.client else {}
+
+    async def _start(self) -> None:
+        client = MCPClient(server_class=self.server_class, tool_wrapper=self.tool_wrapper, tool_remover=self.tool_remover)
+        client.load_servers()
+        self.client = client
+        self.tools = await client.start()
+
+        if self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+        elif client.failed:
+            logger.warning("⚠️ MCP health checks are disabled: degraded servers won't be retried.")
+        logger.info(f"✅ MCP server pool ready with {len(self.tools)} tool(s).")
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.warning(f"⚠️ MCP health check failed: {e}")
+
+    async def check_health(self) -> None:
+        """
+        Ping every server and restart the ones that do not answer; retry degraded ones.
+        """
+        if not self.client:
+            return
+        for server in self.client.servers:
+            if server.name in self.client.failed:
+                await self._retry_degraded(server)
+            elif not await server.ping(timeout=self.ping_timeout):
+                await self._restart(server)
+
+    async def _restart_dead_servers(self) -> None:
+        if not self.client:
+            return
+        for server in self.client.servers:
+            # Degraded servers are retried by the health loop, not on the request path
+            if not server.is_alive() and server.name not in self.client.failed:
+                await self._restart(server)
+
+    async def _retry_degraded(self, server: MCPServer[ToolType]) -> None:
+        async with self._restart_lock:
+            if server.name not in self.client.failed:
+                return
+            try:
+                await self.client.start_server(server)
+            except Exception as e:
+                logger.warning(f"[{server.name}] ⚠️ Still degraded: {e}")
+                return
+            self.tools = self.client.tools
+            logger.info(f"[{server.name}] ✅ Recovered; pool now has {len(self.tools)} tool(s).")
+
+    async def _restart(self, server: MCPServer[ToolType]) -> None:
+        async with self._restart_lock:
+            # Another caller may have restarted it while we waited for the lock
+            if server.is_alive() and await server.ping(timeout=self.ping_timeout):
+                return
+            logger.warning(f"[{server.name}] 🔄 Restarting server.")
+            try:
+                await server.cleanup()
+                # Tools are listed again; a failure marks the server degraded until a retry succeeds
+                await self.client.start_server(server)
+            except Exception as e:
+                logger.error(f"[{server.name}] ❌ Restart failed, retrying in the background: {e}")
+            self.tools = self.client.tools
+
+    async def shutdown(self) -> None:
+        """
+        Stop the health checks and clean up every server in the pool.
+        """
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+        if self._start_task is not None and not self._start_task.done():
+            self._start_task.cancel()
+            await asyncio.gather(self._start_task, return_exceptions=True)
+        self._start_task = None
+
+        if self.client is not None:
+            await self.client.cleanup()
+            self.client = None
+        self.tools = []
+        logger.info("🧹 MCP server pool shut down.")
@@ -1,15 +1,89 @@
 import asyncio
 import shutil
-from typing import Any, Callable, Generic, List, TypeVar
+import time
+from typing import Any, Callable, Generic, List, Optional, TypeVar
 from contextlib import AsyncExitStack
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from core import logger
+from core import logger, config_manager, DeadlineExceeded, wait_within, remaining
 
 # 🔹 Generic type for tools
 ToolType = TypeVar("ToolType")
 
 
+class MCPServerBusy(RuntimeError):
+    """
+    Raised when a tool call can't even wait for a slot because the server's queue is full.
+    """
+
+
+class MCPCircuitOpen(RuntimeError):
+    """
+    Raised without calling the server while its circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    🔹 CircuitBreaker: Stops calling a server that keeps timing out.
+
+    Responsibilities:
+    - Open after `threshold` consecutive timeouts, so calls fail fast.
+    - Let a single trial call through once `cooldown` seconds have passed (half-open).
+    - Close again on the first call the server answers.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 30.0) -> None:
+        """
+        :param threshold: Consecutive timeouts that open the breaker (0 disables it).
+        :param cooldown: Seconds the breaker stays open before a trial call.
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        """
+        True when a call may go to the server; takes the trial slot when half-open.
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_timeout(self) -> bool:
+        """
+        Count a timeout; True when it (re)opens the breaker.
+        """
+        self.failures += 1
+        trial = self._trial_running
+        self._trial_running = False
+        if self.threshold > 0 and (trial or self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Give back the trial slot of a call that ended without a verdict (e.g. cancelled)."""
+        self._trial_running = False
+
+
 class MCPServer(Generic[ToolType]):
     """
     🔹 MCPServer: Manages the lifecycle of an individual MCP-compatible server.
@@ -17,58 +91,214 @@ class MCPServer(Generic[ToolType]):
     Responsibilities:
     - Start and initialize a subprocess-based tool server.
     - Wrap and expose the tools it provides via a supplied wrapper function.
+    - Serve tool calls from any task while the server is running.
     - Clean up all resources on shutdown or failure.
+
+    The subprocess and session are owned by a dedicated background task, so
+    they can be shared across chat sessions and closed from any other task.
+
+    The config's startupTimeout (default MCP_STARTUP_TIMEOUT) bounds how long
+    launching the server and its MCP handshake may take.
+
+    Optional per-server call limits in the config:
+    - callTimeout: seconds a tool call may take (the run's deadline still applies).
+    - maxConcurrency: tool calls in flight at once; the others wait for a slot.
+    - maxQueue: calls allowed to wait for a slot before new ones are rejected.
+    - breakerThreshold / breakerCooldown: consecutive timeouts that open the
+      circuit breaker (default 3), and seconds before a trial call (default 30).
+
+    A call that times out stops waiting, but keeps its maxConcurrency slot until
+    the server answers (or the session closes): the MCP SDK doesn't expose request
+    ids to cancel it on the server.
     """
 
     def __init__(
         self,
         name: str,
         config: dict[str, Any],
-        tool_wrapper: Callable[[ClientSession, Any], ToolType]
+        tool_wrapper: Callable[["MCPServer", Any], ToolType]
     ) -> None:
         """
         :param name: A unique name for this MCP server instance.
         :param config: Dict containing 'command', 'args', 'env', etc.
-        :param tool_wrapper: Function that takes (ClientSession, tool_info) → ToolType
+        :param tool_wrapper: Function that takes (MCPServer, tool_info) → ToolType
         """
         self.name = name
         self.config = config
         self.tool_wrapper = tool_wrapper
         self.session: ClientSession | None = None
-        self.exit_stack = AsyncExitStack()
+        self._owner_task: asyncio.Task | None = None
+        self._stop_event: asyncio.Event | None = None
         self._cleanup_lock = asyncio.Lock()
+        self.startup_timeout = float(config.get("startupTimeout", config_manager.MCP_STARTUP_TIMEOUT) or 0)
 
-    async def initialize(self) -> None:
+        self.call_timeout = float(config.get("callTimeout") or 0)
+        max_concurrency = int(config.get("maxConcurrency") or 0)
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.max_queue: Optional[int] = int(config["maxQueue"]) if config.get("maxQueue") is not None else None
+        self._waiting = 0
+        self._calls: set[asyncio.Task] = set()  # requests in flight, including abandoned ones
+        self.breaker = CircuitBreaker(
+            threshold=int(config.get("breakerThreshold", 3)),
+            cooldown=float(config.get("breakerCooldown", 30))
+        )
+
+    def _server_parameters(self) -> StdioServerParameters:
+        # Resolve executable path
+        command = shutil.which("npx") if self.config.get("command") == "npx" else self.config.get("command")
+        if not command:
+            raise ValueError(f"[{self.name}] Invalid or missing 'command' in server config.")
+
+        # Prepare parameters for starting the server process
+        return StdioServerParameters(
+            command=command,
+            args=self.config.get("args", []),
+            env=self.config.get("env")
+        )
+
+    async def _serve(self, ready: asyncio.Future, stop_event: asyncio.Event) -> None:
         """
-        🔹 Initialize the server by launching the subprocess and starting an MCP session.
+        🔹 Owner task: opens the stdio transport and session, then holds them open until stopped.
         """
         try:
-            # Resolve executable path
-            command = shutil.which("npx") if self.config.get("command") == "npx" else self.config.get("command")
-            if not command:
-                raise ValueError(f"[{self.name}] Invalid or missing 'command' in server config.")
-
-            # Prepare parameters for starting the server process
-            params = StdioServerParameters(
-                command=command,
-                args=self.config.get("args", []),
-                env=self.config.get("env")
-            )
+            async with AsyncExitStack() as exit_stack:
+                params = self._server_parameters()
+                logger.info(f"[{self.name}] 🚀 Launching server: {params.command} {' '.join(params.args)}")
+
+                # Set up stdio transport and client session
+                read, write = await exit_stack.enter_async_context(stdio_client(params))
+                session = await exit_stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                self.session = session
+                ready.set_result(None)
 
-            logger.info(f"[{self.name}] 🚀 Launching server: {command} {' '.join(params.args)}")
+                await stop_event.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error(f"[{self.name}] ❌ Server session terminated: {e}")
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
 
-            # Set up stdio transport and client session
-            stdio_transport = await self.exit_stack.enter_async_context(stdio_client(params))
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(ClientSession(read, write))
-            await session.initialize()
-            self.session = session
+    async def initialize(self) -> None:
+        """
+        🔹 Initialize the server by launching the subprocess and starting an MCP session.
 
+        :raises RuntimeError: When the server fails to start or isn't ready within startup_timeout.
+        """
+        ready = asyncio.get_running_loop().create_future()
+        self._stop_event = asyncio.Event()
+        self._owner_task = asyncio.create_task(self._serve(ready, self._stop_event))
+        try:
+            async with asyncio.timeout(self.startup_timeout or None):
+                await asyncio.shield(ready)
+            # A fresh process starts with a closed breaker
+            self.breaker.record_success()
             logger.info(f"[{self.name}] ✅ Server initialized and session established.")
-        except Exception as e:
-            logger.error(f"[{self.name}] ❌ Error during initialization: {e}")
+        except (Exception, asyncio.CancelledError) as e:
+            # Not ready in time (or the caller gave up): stop the owner task wherever it is
+            self._owner_task.cancel()
             await self.cleanup()
-            raise RuntimeError(f"Failed to initialize server '{self.name}'") from e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            reason = f"not ready within {self.startup_timeout:.0f}s" if isinstance(e, TimeoutError) else str(e)
+            logger.error(f"[{self.name}] ❌ Error during initialization: {reason}")
+            raise RuntimeError(f"Failed to initialize server '{self.name}': {reason}") from e
+
+    def is_alive(self) -> bool:
+        """
+        🔹 True while the owner task is running and the session is established.
+        """
+        return (
+            self.session is not None
+            and self._owner_task is not None
+            and not self._owner_task.done()
+        )
+
+    async def ping(self, timeout: float = 5.0) -> bool:
+        """
+        🔹 Check that the server answers an MCP ping within `timeout` seconds.
+        """
+        if not self.is_alive():
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"[{self.name}] ⚠️ Ping failed: {e}")
+            return False
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any] | None = None) -> Any:
+        """
+        🔹 Invoke a tool on the current session, within the server's call limits.
+
+        :raises MCPCircuitOpen: While the server's circuit breaker is open.
+        :raises MCPServerBusy: When maxQueue calls are already waiting for a slot.
+        :raises DeadlineExceeded: When the call outlives callTimeout or the run's deadline.
+        """
+        if not self.is_alive():
+            raise RuntimeError(f"[{self.name}] Cannot call tool '{tool_name}': server is not running.")
+        trial = self.breaker.state == "half_open"
+        if not self.breaker.allow():
+            raise MCPCircuitOpen(f"[{self.name}] Circuit open after {self.breaker.failures} timeouts; not calling '{tool_name}'.")
+
+        try:
+            if self._slots is not None:
+                if self._slots.locked() and self.max_queue is not None and self._waiting >= self.max_queue:
+                    raise MCPServerBusy(f"[{self.name}] Busy: {self._waiting} tool calls already waiting.")
+                self._waiting += 1
+                try:
+                    await wait_within(self._slots.acquire(), what=f"Waiting for a '{self.name}' slot")
+                finally:
+                    self._waiting -= 1
+            return await self._call_with_timeout(tool_name, arguments)
+        finally:
+            # A trial call that ended without a verdict (busy, cancelled) lets the next one try
+            if trial:
+                self.breaker.release_trial()
+
+    async def _call_with_timeout(self, tool_name: str, arguments: dict[str, Any] | None) -> Any:
+        """
+        Run the request in its own task, which holds the slot taken by call_tool.
+        A caller that times out or is cancelled stops waiting, but the slot stays
+        taken until the server answers, so a stuck server can't be flooded.
+        """
+        session = self.session
+        if session is None:
+            self._call_finished(None)
+            raise RuntimeError(f"[{self.name}] Cannot call tool '{tool_name}': server is not running.")
+        # Only timeouts of the server's own budget count against it, not a run running out of time
+        left = remaining()
+        own_timeout = self.call_timeout > 0 and (left is None or left >= self.call_timeout)
+
+        call = asyncio.create_task(session.call_tool(tool_name, arguments=arguments))
+        self._calls.add(call)
+        call.add_done_callback(self._call_finished)
+        try:
+            result = await wait_within(
+                asyncio.shield(call),
+                self.call_timeout or None,
+                what=f"Tool '{tool_name}' on '{self.name}'"
+            )
+        except DeadlineExceeded:
+            logger.warning(f"[{self.name}] ⏲️ Gave up on '{tool_name}'; {len(self._calls)} call(s) still pending on the server.")
+            if own_timeout and self.breaker.record_timeout():
+                logger.error(f"[{self.name}] 🔌 Circuit opened after {self.breaker.failures} consecutive timeouts.")
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _call_finished(self, call: Optional[asyncio.Task]) -> None:
+        if call is not None:
+            self._calls.discard(call)
+            # Retrieve the outcome of abandoned calls (e.g. session closed) so it isn't reported as unhandled
+            if not call.cancelled():
+                call.exception()
+        if self._slots is not None:
+            self._slots.release()
 
     async def create_tools(self) -> List[ToolType]:
         """
@@ -84,7 +314,7 @@ class MCPServer(Generic[ToolType]):
             tools: List[ToolType] = []
 
             for tool_info in tools_response.tools:
-                wrapped = await self.tool_wrapper(self.session, tool_info)
+                wrapped = await self.tool_wrapper(self, tool_info)
                 tools.append(wrapped)
 
             logger.info(f"[{self.name}] 🛠️ {len(tools)} tool(s) loaded successfully.")
@@ -100,7 +330,12 @@ class MCPServer(Generic[ToolType]):
         """
         async with self._cleanup_lock:
             try:
-                await self.exit_stack.aclose()
+                if self._stop_event is not None:
+                    self._stop_event.set()
+                if self._owner_task is not None:
+                    await asyncio.gather(self._owner_task, return_exceptions=True)
+                self._owner_task = None
+                self._stop_event = None
                 self.session = None
                 logger.info(f"[{self.name}] 🧹 Server resources cleaned up.")
             except Exception as e:
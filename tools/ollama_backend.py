@@ -0,0 +1,504 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+import httpx
+import ollama
+from core import logger, config_manager
+
+
+def normalize_model_name(name: str) -> str:
+    """
+    Ollama reports 'llama3' as 'llama3:latest'; compare names in that form.
+    """
+    return name if ":" in name else f"{name}:latest"
+
+
+async def close_client(client: ollama.AsyncClient) -> None:
+    """
+    Close the HTTP connections of an Ollama client. ollama.AsyncClient has no
+    public close (0.4.x), so this is the one place that reaches its httpx client.
+    """
+    public_close = getattr(client, "aclose", None)
+    if callable(public_close):
+        await public_close()
+        return
+    http_client = getattr(client, "_client", None)
+    if isinstance(http_client, httpx.AsyncClient):
+        await http_client.aclose()
+
+
+def parse_keep_alive(value: Any) -> Optional[int | str]:
+    """
+    Ollama reads numeric keep_alive values as seconds and strings as durations ("30m").
+    Empty means the server default.
+    """
+    if value in (None, ""):
+        return None
+    text = str(value).strip()
+    return int(text) if text.lstrip("-").isdigit() else text
+
+
+class OllamaBackend:
+    """
+    🔹 OllamaBackend: Shared, non-blocking gateway to the Ollama HTTP API.
+
+    Responsibilities:
+    - Talk to Ollama through `ollama.AsyncClient` so calls never block the event loop.
+    - Reuse a single keep-alive connection pool across agents and chat sessions.
+    - Limit the number of in-flight requests per model.
+    - Track in-flight requests and last use per model (for residency decisions).
+    """
+
+    def __init__(self, host: Optional[str] = None, max_inflight_per_model: int = 2) -> None:
+        """
+        :param host: Ollama host URL. Falls back to the client's default (OLLAMA_HOST or localhost).
+        :param max_inflight_per_model: Maximum concurrent requests sent for the same model.
+        """
+        self.host = host or None
+        self.max_inflight_per_model = max(1, int(max_inflight_per_model))
+        self._client: Optional[ollama.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._limits: dict[str, asyncio.Semaphore] = {}
+        self.inflight: dict[str, int] = {}
+        self.last_used: dict[str, float] = {}
+
+    @property
+    def client(self) -> ollama.AsyncClient:
+        """
+        Return the pooled AsyncClient, creating it for the running event loop if needed.
+        Connections are bound to the loop that opened them, so a new loop gets a new pool.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = ollama.AsyncClient(host=self.host)
+            self._client_loop = loop
+            self._limits = {}
+            logger.debug(f"🔌 Created Ollama async client for host: {self.host or 'default'}")
+        return self._client
+
+    def _limit(self, model: str) -> asyncio.Semaphore:
+        if model not in self._limits:
+            self._limits[model] = asyncio.Semaphore(self.max_inflight_per_model)
+        return self._limits[model]
+
+    @asynccontextmanager
+    async def _use(self, model: str):
+        """
+        Hold a request slot for `model` and record the model as in use.
+        """
+        async with self._limit(model):
+            self.inflight[model] = self.inflight.get(model, 0) + 1
+            self.last_used[model] = time.monotonic()
+            try:
+                yield
+            finally:
+                self.inflight[model] -= 1
+                self.last_used[model] = time.monotonic()
+
+    async def chat(self, model: str, messages: list[dict], tools: Optional[list[dict]] = None, **kwargs: Any) -> ollama.ChatResponse:
+        """
+        Send a chat request, waiting for a free slot for the model first.
+        """
+        client = self.client
+        async with self._use(model):
+            return await client.chat(model=model, messages=messages, tools=tools or [], **kwargs)
+
+    async def chat_stream(self, model: str, messages: list[dict], **kwargs: Any) -> AsyncIterator[ollama.ChatResponse]:
+        """
+        Send a streaming chat request and yield response chunks as they arrive.
+        The model slot is held until the stream is exhausted or closed.
+        """
+        client = self.client
+        async with self._use(model):
+            async for chunk in await client.chat(model=model, messages=messages, stream=True, **kwargs):
+                yield chunk
+
+    async def list_models(self) -> ollama.ListResponse:
+        """
+        Installed models (GET /api/tags).
+        """
+        return await self.client.list()
+
+    async def running_models(self) -> ollama.ProcessResponse:
+        """
+        Models currently loaded in memory (GET /api/ps).
+        """
+        return await self.client.ps()
+
+    async def load_model(self, model: str, keep_alive: Optional[int | str] = None) -> None:
+        """
+        Load a model into memory without generating anything (empty /api/generate).
+        """
+        await self.client.generate(model=model, keep_alive=keep_alive)
+        self.last_used[model] = time.monotonic()
+
+    async def unload_model(self, model: str) -> None:
+        """
+        Evict a model from memory (keep_alive=0).
+        """
+        await self.client.generate(model=model, keep_alive=0)
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled HTTP connections.
+        """
+        if self._client is not None:
+            try:
+                await close_client(self._client)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to close Ollama client: {e}")
+            self._client = None
+            self._client_loop = None
+
+
+def is_host_error(error: BaseException) -> bool:
+    """
+    Errors that say the host (not the request) is at fault: worth trying another host.
+    """
+    if isinstance(error, (ConnectionError, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, ollama.ResponseError) and error.status_code >= 500
+
+
+def is_missing_model(error: BaseException) -> bool:
+    return isinstance(error, ollama.ResponseError) and error.status_code == 404
+
+
+@dataclass
+class _HostState:
+    """
+    Routing state of one Ollama host in an OllamaBackendPool.
+    """
+    backend: OllamaBackend
+    outstanding: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+    models: Optional[set[str]] = None
+    checked_at: float = 0.0
+    picks: int = 0
+
+    @property
+    def url(self) -> str:
+        return self.backend.host
+
+    def is_up(self, now: float) -> bool:
+        return self.down_until <= now
+
+
+class OllamaBackendPool:
+    """
+    🔹 OllamaBackendPool: Spreads Ollama calls over several hosts.
+
+    Responsibilities:
+    - Discover which models each host serves (/api/tags), refreshed in the background.
+    - Route every call to the host with the fewest outstanding requests among
+      the healthy hosts serving the model.
+    - Passive health checks: a host failing with a connection or server error is
+      taken out of rotation for an increasing backoff, then retried by live traffic.
+    - Fail over to the next host, including for streams that have not produced a chunk yet.
+    - Expose the OllamaBackend interface, so agents and model managers work unchanged.
+    """
+
+    def __init__(
+        self,
+        hosts: list[str],
+        max_inflight_per_model: int = 2,
+        discovery_ttl: float = 5.0,
+        retry_after: float = 5.0
+    ) -> None:
+        """
+        :param hosts: Ollama host URLs.
+        :param max_inflight_per_model: Maximum concurrent requests per model and host.
+        :param discovery_ttl: Seconds a host's model list is trusted before a background refresh.
+        :param retry_after: Seconds a failing host is skipped; doubles with each failure (max 60s).
+        """
+        self.hosts = [
+            _HostState(OllamaBackend(host=host, max_inflight_per_model=max_inflight_per_model))
+            for host in hosts
+        ]
+        self.discovery_ttl = discovery_ttl
+        self.retry_after = retry_after
+        self._discovery: Optional[asyncio.Future] = None
+
+    @property
+    def host(self) -> str:
+        return ",".join(state.url for state in self.hosts)
+
+    @property
+    def inflight(self) -> dict[str, int]:
+        """
+        In-flight requests per model, summed over hosts.
+        """
+        totals: dict[str, int] = {}
+        for state in self.hosts:
+            for model, count in state.backend.inflight.items():
+                totals[model] = totals.get(model, 0) + count
+        return totals
+
+    @property
+    def last_used(self) -> dict[str, float]:
+        """
+        Last use per model on any host.
+        """
+        latest: dict[str, float] = {}
+        for state in self.hosts:
+            for model, used in state.backend.last_used.items():
+                latest[model] = max(latest.get(model, 0.0), used)
+        return latest
+
+    # --- health -----------------------------------------------------------------
+
+    def _mark_failure(self, state: _HostState, error: BaseException) -> None:
+        state.failures += 1
+        backoff = min(60.0, self.retry_after * 2 ** (state.failures - 1))
+        state.down_until = time.monotonic() + backoff
+        logger.warning(f"⚠️ Ollama host {state.url} failed ({error!r}), skipping it for {backoff:.0f}s.")
+
+    def _retryable(self, state: _HostState, model: Optional[str], error: BaseException) -> bool:
+        """
+        Record a failed call on `state`; True when another host may succeed.
+        """
+        if is_host_error(error):
+            self._mark_failure(state, error)
+            return True
+        if is_missing_model(error):
+            if model and state.models is not None:
+                state.models.discard(normalize_model_name(model))
+            return True
+        return False
+
+    def _mark_success(self, state: _HostState) -> None:
+        if state.failures:
+            logger.info(f"✅ Ollama host {state.url} is back in rotation.")
+        state.failures = 0
+        state.down_until = 0.0
+
+    # --- discovery --------------------------------------------------------------
+
+    async def _discover_host(self, state: _HostState) -> None:
+        try:
+            installed = await state.backend.list_models()
+        except Exception as e:
+            if is_host_error(e):
+                self._mark_failure(state, e)
+            return
+        state.models = {normalize_model_name(m.model) for m in installed.models}
+        state.checked_at = time.monotonic()
+        self._mark_success(state)
+
+    async def discover(self) -> None:
+        """
+        Refresh the model list of every host (concurrent refreshes share one round).
+        """
+        if self._discovery is None or self._discovery.done():
+            self._discovery = asyncio.ensure_future(
+                asyncio.gather(*(self._discover_host(state) for state in self.hosts))
+            )
+        await asyncio.shield(self._discovery)
+
+    async def _ensure_discovered(self) -> None:
+        now = time.monotonic()
+        if all(state.models is None for state in self.hosts):
+            await self.discover()
+        elif any(now - state.checked_at > self.discovery_ttl for state in self.hosts):
+            # Serve from the current lists while they refresh (a host without one is tried anyway)
+            if self._discovery is None or self._discovery.done():
+                self._discovery = asyncio.ensure_future(
+                    asyncio.gather(*(self._discover_host(state) for state in self.hosts))
+                )
+
+    # --- routing ----------------------------------------------------------------
+
+    def _candidates(self, model: Optional[str], exclude: set[int]) -> list[_HostState]:
+        """
+        Hosts to try for `model`, best first.
+        """
+        now = time.monotonic()
+        remaining = [state for i, state in enumerate(self.hosts) if i not in exclude]
+        key = normalize_model_name(model) if model else None
+        serving = [s for s in remaining if key is None or s.models is None or key in s.models] or remaining
+        up = [s for s in serving if s.is_up(now)]
+        if up:
+            return sorted(up, key=lambda s: (s.outstanding, s.picks))
+        # Every host is down: try the one that should recover first rather than failing outright
+        return sorted(serving, key=lambda s: s.down_until)
+
+    async def _route(self, model: Optional[str], call: Callable[[OllamaBackend], Awaitable[Any]]) -> Any:
+        """
+        Run `call` on the best host for `model`, failing over to the others.
+        """
+        await self._ensure_discovered()
+        tried: set[int] = set()
+        last_error: Optional[BaseException] = None
+        while len(tried) < len(self.hosts):
+            candidates = self._candidates(model, tried)
+            if not candidates:
+                break
+            state = candidates[0]
+            tried.add(self.hosts.index(state))
+            state.outstanding += 1
+            state.picks += 1
+            try:
+                result = await call(state.backend)
+            except Exception as e:
+                if not self._retryable(state, model, e):
+                    raise
+                last_error = e
+                continue
+            finally:
+                state.outstanding -= 1
+            self._mark_success(state)
+            return result
+        raise last_error or ConnectionError("No Ollama host available.")
+
+    async def chat(self, model: str, messages: list[dict], tools: Optional[list[dict]] = None, **kwargs: Any) -> ollama.ChatResponse:
+        """
+        Send a chat request to the least busy healthy host serving `model`.
+        """
+        return await self._route(model, lambda backend: backend.chat(model=model, messages=messages, tools=tools, **kwargs))
+
+    async def chat_stream(self, model: str, messages: list[dict], **kwargs: Any) -> AsyncIterator[ollama.ChatResponse]:
+        """
+        Stream a chat response from the least busy healthy host serving `model`.
+        A host failing before its first chunk is replaced; later failures are raised.
+        """
+        await self._ensure_discovered()
+        tried: set[int] = set()
+        last_error: Optional[BaseException] = None
+        while len(tried) < len(self.hosts):
+            candidates = self._candidates(model, tried)
+            if not candidates:
+                break
+            state = candidates[0]
+            tried.add(self.hosts.index(state))
+            state.outstanding += 1
+            state.picks += 1
+            started = False
+            try:
+                async for chunk in state.backend.chat_stream(model=model, messages=messages, **kwargs):
+                    started = True
+                    yield chunk
+                self._mark_success(state)
+                return
+            except Exception as e:
+                if not self._retryable(state, model, e) or started:
+                    raise
+                last_error = e
+            finally:
+                state.outstanding -= 1
+        raise last_error or ConnectionError("No Ollama host available.")
+
+    # --- inventory and residency --------------------------------------------------
+
+    async def _gather_up(self, call: Callable[[OllamaBackend], Awaitable[Any]]) -> list[Any]:
+        """
+        Run `call` on every host currently up; failing hosts are marked and skipped.
+        """
+        now = time.monotonic()
+        states = [state for state in self.hosts if state.is_up(now)] or self.hosts
+        outcomes = await asyncio.gather(*(call(state.backend) for state in states), return_exceptions=True)
+        results = []
+        for state, outcome in zip(states, outcomes):
+            if isinstance(outcome, BaseException):
+                if not is_host_error(outcome):
+                    raise outcome
+                self._mark_failure(state, outcome)
+            else:
+                self._mark_success(state)
+                results.append(outcome)
+        if not results:
+            raise ConnectionError("No Ollama host available.")
+        return results
+
+    async def list_models(self) -> ollama.ListResponse:
+        """
+        Models installed on any host (each listed once).
+        """
+        merged: dict[str, Any] = {}
+        for response in await self._gather_up(lambda backend: backend.list_models()):
+            for m in response.models:
+                merged.setdefault(m.model, m)
+        return ollama.ListResponse(models=list(merged.values()))
+
+    async def running_models(self) -> ollama.ProcessResponse:
+        """
+        Models loaded on any host, with the largest footprint reported.
+        """
+        merged: dict[str, Any] = {}
+        for response in await self._gather_up(lambda backend: backend.running_models()):
+            for m in response.models:
+                if m.model not in merged or (m.size or 0) > (merged[m.model].size or 0):
+                    merged[m.model] = m
+        return ollama.ProcessResponse(models=list(merged.values()))
+
+    def _serving(self, model: str) -> list[_HostState]:
+        key = normalize_model_name(model)
+        return [state for state in self.hosts if state.models is None or key in state.models]
+
+    async def load_model(self, model: str, keep_alive: Optional[int | str] = None) -> None:
+        """
+        Load a model on every host serving it, so routing stays free to pick any of them.
+        """
+        await self._ensure_discovered()
+        states = self._serving(model)
+        outcomes = await asyncio.gather(
+            *(state.backend.load_model(model, keep_alive=keep_alive) for state in states),
+            return_exceptions=True
+        )
+        errors = [o for o in outcomes if isinstance(o, BaseException)]
+        for state, outcome in zip(states, outcomes):
+            if isinstance(outcome, BaseException) and is_host_error(outcome):
+                self._mark_failure(state, outcome)
+        if errors and len(errors) == len(outcomes):
+            raise errors[0]
+
+    async def unload_model(self, model: str) -> None:
+        """
+        Evict a model from every host serving it.
+        """
+        await self._gather_up(lambda backend: backend.unload_model(model))
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "host": state.url,
+                "up": state.is_up(now),
+                "outstanding": state.outstanding,
+                "failures": state.failures,
+                "models": sorted(state.models) if state.models is not None else None
+            }
+            for state in self.hosts
+        ]
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled HTTP connections of every host.
+        """
+        for state in self.hosts:
+            await state.backend.aclose()
+
+
+def create_backend() -> OllamaBackend | OllamaBackendPool:
+    """
+    A pool when OLLAMA_HOSTS lists several hosts, a single backend otherwise.
+    """
+    hosts = [h.strip() for h in config_manager.OLLAMA_HOSTS.split(",") if h.strip()]
+    if len(hosts) > 1:
+        logger.info(f"🌐 Balancing Ollama calls over {len(hosts)} hosts: {', '.join(hosts)}")
+        return OllamaBackendPool(
+            hosts,
+            max_inflight_per_model=config_manager.OLLAMA_MAX_INFLIGHT_PER_MODEL,
+            discovery_ttl=config_manager.MODEL_INVENTORY_TTL,
+            retry_after=config_manager.OLLAMA_HOST_RETRY_SECONDS
+        )
+    return OllamaBackend(
+        host=hosts[0] if hosts else config_manager.OLLAMA_HOST,
+        max_inflight_per_model=config_manager.OLLAMA_MAX_INFLIGHT_PER_MODEL
+    )
+
+
+# ✅ Shared backend reused by every OllamaAgent
+ollama_backend = create_backend()
@@ -1,104 +1,261 @@
-import subprocess
-import re
-from typing import List, Dict
+import asyncio
+import time
+from typing import Any, List, Dict, Optional
+from core import logger, config_manager
+from .ollama_backend import OllamaBackend, ollama_backend, normalize_model_name, parse_keep_alive
 
-def run_command(cmd: str) -> str:
-    """
-    Executes a shell command and returns its stdout as a string.
-    Captures stderr and returns a formatted error message on failure.
-    """
-    try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.strip() if e.stderr else str(e)
-        return f"❌ Error executing '{cmd}': {error_msg}"
-    except Exception as e:
-        return f"❌ Unexpected error: {str(e)}"
 
-def parse_installed_models(raw_output: str) -> List[Dict[str, str]]:
+def format_size(num_bytes: Optional[int]) -> str:
+    """
+    Human-readable size, like the `ollama ls` SIZE column (e.g. '4.7 GB').
     """
-    Parses the output of 'ollama ls' to extract installed model details.
+    if not num_bytes:
+        return "-"
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"
 
-    Expected format (example):
-    NAME         TAG       SIZE    MODIFIED
-    llama3       latest    4.2GB   2024-04-08
 
-    Returns:
-        A list of models with name, size, modified date, and status.
+class OllamaModelManager:
     """
-    lines = raw_output.strip().split("\n")
-    models = []
-    
-    if len(lines) < 2:
-        return models  # No models found
-
-    for line in lines[1:]:  # Skip header
-        parts = re.split(r"\s{2,}", line.strip())
-        if len(parts) >= 4:
-            models.append({
-                "name": parts[0],
-                "size": parts[2],
-                "modified": parts[3],
-                "status": "stopped"
-            })
-    return models
-
-def parse_running_models(raw_output: str) -> List[str]:
+    🔹 OllamaModelManager: Cached inventory of installed and running Ollama models.
+
+    Responsibilities:
+    - Read installed (/api/tags) and loaded (/api/ps) models through the HTTP API.
+    - Cache the merged inventory for a short TTL.
+    - Coalesce concurrent refreshes into a single pair of requests.
     """
-    Parses the output of 'ollama ps' to extract the names of running models.
 
-    Expected format:
-    NAME         STATUS
-    llama3       running
+    def __init__(self, backend: OllamaBackend, ttl: float = 5.0) -> None:
+        """
+        :param backend: Shared Ollama backend used for the API calls.
+        :param ttl: Seconds an inventory is served from cache.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self._models: Optional[List[Dict[str, str]]] = None
+        self._fetched_at = 0.0
+        self._refresh: Optional[asyncio.Future] = None
 
-    Returns:
-        A list of model names that are currently running.
-    """
-    lines = raw_output.strip().split("\n")
-    running_models = []
+    def invalidate(self) -> None:
+        """
+        Drop the cached inventory (e.g. after a model was loaded or unloaded).
+        """
+        self._models = None
 
-    if len(lines) < 2:
-        return running_models  # No running models
+    async def _fetch(self) -> List[Dict[str, str]]:
+        installed, running = await asyncio.gather(
+            self.backend.list_models(),
+            self.backend.running_models()
+        )
+        running_names = {m.model for m in running.models}
+        return [
+            {
+                "name": m.model,
+                "size": format_size(m.size),
+                "size_bytes": m.size or 0,
+                "modified": m.modified_at.strftime("%Y-%m-%d %H:%M") if m.modified_at else "-",
+                "status": "running" if m.model in running_names else "stopped"
+            }
+            for m in installed.models
+        ]
 
-    for line in lines[1:]:  # Skip header
-        parts = re.split(r"\s{2,}", line.strip())
-        if parts:
-            running_models.append(parts[0])
-    return running_models
+    async def list_models(self, force: bool = False) -> List[Dict[str, str]]:
+        """
+        Return installed models with their status ('running' or 'stopped').
 
-def list_models_with_status() -> List[Dict[str, str]]:
+        :param force: Bypass the cache.
+        :return: List of dicts with name, size, size_bytes, modified and status.
+        """
+        if not force and self._models is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return [dict(m) for m in self._models]
+
+        # Callers arriving during a refresh wait for it instead of starting their own
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._fetch())
+        refresh = self._refresh
+        models = await asyncio.shield(refresh)
+        if self._refresh is refresh:
+            self._models = models
+            self._fetched_at = time.monotonic()
+        return [dict(m) for m in models]
+
+
+# ✅ Shared model inventory
+model_manager = OllamaModelManager(backend=ollama_backend, ttl=config_manager.MODEL_INVENTORY_TTL)
+
+
+async def list_models_with_status(force: bool = False) -> List[Dict[str, str]]:
     """
     Combines installed and running model information to produce a status list.
 
     Returns:
-        A list of all installed models, with their current status ('running' or 'stopped').
+        A list of all installed models, with their current status ('running' or 'stopped'),
+        or a single {"error": ...} entry when Ollama cannot be reached.
     """
-    raw_installed = run_command("ollama ls")
-    raw_running = run_command("ollama ps")
+    try:
+        return await model_manager.list_models(force=force)
+    except Exception as e:
+        logger.error(f"❌ Failed to list Ollama models: {e}")
+        return [{"error": f"❌ Error listing Ollama models: {e}"}]
 
-    # Handle command errors
-    if raw_installed.startswith("❌") or raw_running.startswith("❌"):
-        return [{"error": raw_installed if raw_installed.startswith("❌") else raw_running}]
-    
-    installed_models = parse_installed_models(raw_installed)
-    running_models = parse_running_models(raw_running)
 
-    # Match installed models with running models
-    for model in installed_models:
-        if model["name"] in running_models:
-            model["status"] = "running"
-    return installed_models
+class ModelResidencyManager:
+    """
+    🔹 ModelResidencyManager: Decides which models stay loaded in Ollama's memory.
+
+    Responsibilities:
+    - Preload models through the API (empty generate request) instead of the CLI.
+    - Track the memory used by resident models against a RAM budget.
+    - Evict least-recently-used idle models when a new one needs room.
+    - Pre-warm the selected model in the background, coalescing duplicate loads.
+    """
+
+    def __init__(
+        self,
+        backend: OllamaBackend,
+        inventory: OllamaModelManager,
+        budget_bytes: int = 0,
+        keep_alive: Optional[int | str] = None,
+        sync_ttl: float = 5.0
+    ) -> None:
+        """
+        :param backend: Shared Ollama backend (also tracks per-model use).
+        :param inventory: Model inventory, used to estimate the size of models not yet loaded.
+        :param budget_bytes: Memory allowed for resident models; 0 disables eviction.
+        :param keep_alive: keep_alive sent with preloads (server default when None).
+        :param sync_ttl: Seconds the resident set read from /api/ps is trusted.
+        """
+        self.backend = backend
+        self.inventory = inventory
+        self.budget_bytes = budget_bytes
+        self.keep_alive = keep_alive
+        self.sync_ttl = sync_ttl
+        self._resident: Dict[str, int] = {}
+        self._synced_at = 0.0
+        self._lock = asyncio.Lock()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+
+    async def _sync(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self._synced_at < self.sync_ttl:
+            return
+        running = await self.backend.running_models()
+        self._resident = {normalize_model_name(m.model): m.size or 0 for m in running.models}
+        self._synced_at = time.monotonic()
+
+    async def _estimate_size(self, key: str) -> int:
+        for model in await self.inventory.list_models():
+            if normalize_model_name(model["name"]) == key:
+                return model["size_bytes"]
+        return 0
+
+    def _last_used(self, key: str) -> float:
+        return max(
+            (t for name, t in self.backend.last_used.items() if normalize_model_name(name) == key),
+            default=0.0
+        )
+
+    def _busy(self, key: str) -> bool:
+        return any(n > 0 for name, n in self.backend.inflight.items() if normalize_model_name(name) == key)
+
+    async def _make_room(self, needed: int, keep: str) -> None:
+        used = sum(self._resident.values())
+        candidates = sorted(
+            (m for m in self._resident if m != keep and not self._busy(m)),
+            key=self._last_used
+        )
+        while used + needed > self.budget_bytes and candidates:
+            victim = candidates.pop(0)
+            logger.info(f"📤 Evicting model '{victim}' to stay within the RAM budget")
+            await self.backend.unload_model(victim)
+            used -= self._resident.pop(victim, 0)
+        if used + needed > self.budget_bytes:
+            logger.warning(
+                f"⚠️ Loading '{keep}' exceeds the RAM budget "
+                f"({format_size(used + needed)} > {format_size(self.budget_bytes)}): remaining models are in use."
+            )
+
+    async def _load(self, model: str) -> None:
+        key = normalize_model_name(model)
+        async with self._lock:
+            await self._sync()
+            if key in self._resident:
+                return
+            needed = await self._estimate_size(key)
+            if self.budget_bytes > 0:
+                await self._make_room(needed, keep=key)
+            logger.info(f"📥 Preloading model '{model}'")
+            await self.backend.load_model(model, keep_alive=self.keep_alive)
+            self._resident[key] = needed
+            self._synced_at = 0.0  # read the real footprint on the next sync
+            self.inventory.invalidate()
+
+    async def ensure_loaded(self, model: str) -> None:
+        """
+        Make sure `model` is resident, evicting others if the budget requires it.
+        Concurrent calls for the same model wait for a single load.
+        """
+        key = normalize_model_name(model)
+        future = self._loading.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(model))
+            self._loading[key] = future
+            future.add_done_callback(lambda f: self._loading.pop(key, None))
+        await asyncio.shield(future)
+
+    def prewarm(self, model: Optional[str]) -> None:
+        """
+        Start loading `model` in the background (errors are logged, not raised).
+        """
+        if not model:
+            return
+
+        async def warm():
+            try:
+                await self.ensure_loaded(model)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to pre-warm model '{model}': {e}")
 
-def run_model(model_name: str) -> str:
+        task = asyncio.create_task(warm())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def unload(self, model: str) -> None:
+        """
+        Evict `model` from memory.
+        """
+        key = normalize_model_name(model)
+        async with self._lock:
+            await self.backend.unload_model(model)
+            self._resident.pop(key, None)
+            self.inventory.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget": format_size(self.budget_bytes) if self.budget_bytes else "unlimited",
+            "used": format_size(sum(self._resident.values())),
+            "resident": sorted(self._resident, key=self._last_used, reverse=True)
+        }
+
+
+# ✅ Shared residency manager
+# Decimal megabytes, like format_size and the sizes Ollama reports
+residency_manager = ModelResidencyManager(
+    backend=ollama_backend,
+    inventory=model_manager,
+    budget_bytes=config_manager.MODEL_RAM_BUDGET_MB * 1000 * 1000,
+    keep_alive=parse_keep_alive(config_manager.OLLAMA_KEEP_ALIVE),
+    sync_ttl=config_manager.MODEL_INVENTORY_TTL
+)
+
+
+async def run_model(model_name: str) -> str:
     """
-    Runs the specified Ollama model.
+    Loads the specified Ollama model into memory (evicting others if over the RAM budget).
     
     Args:
         model_name: The name of the model to run.
@@ -108,11 +265,16 @@ def run_model(model_name: str) -> str:
     """
     if not model_name:
         return "⚠️ Please provide a model name to run."
-    return run_command(f"ollama run {model_name}")
+    try:
+        await residency_manager.ensure_loaded(model_name)
+        return f"✅ Model '{model_name}' is loaded."
+    except Exception as e:
+        return f"❌ Error loading '{model_name}': {e}"
+
 
-def stop_model(model_name: str) -> str:
+async def stop_model(model_name: str) -> str:
     """
-    Stops the specified Ollama model.
+    Unloads the specified Ollama model from memory.
     
     Args:
         model_name: The name of the model to stop.
@@ -122,4 +284,8 @@ def stop_model(model_name: str) -> str:
     """
     if not model_name:
         return "⚠️ Please provide a model name to stop."
-    return run_command(f"ollama stop {model_name}")
+    try:
+        await residency_manager.unload(model_name)
+        return f"✅ Model '{model_name}' stopped."
+    except Exception as e:
+        return f"❌ Error stopping '{model_name}': {e}"
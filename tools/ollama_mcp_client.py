@@ -1,8 +1,11 @@
-import ollama
-from typing import Any,Dict
-from core import logger
+import asyncio
+from contextlib import aclosing, asynccontextmanager
+from typing import Any,AsyncIterator,Dict,Optional
+from core import logger, config_manager, span, start_span, Deadline, DeadlineExceeded, deadline_scope, wait_within
+from .ollama_backend import OllamaBackend, ollama_backend, parse_keep_alive
 from .mcp_interface.mcp_server import MCPServer
-from .mcp_interface.mcp_client import MCPClient
+from .mcp_interface.mcp_pool import MCPServerPool
+from .tool_cache import tool_result_cache
 
 def get_tool_description(tools, tool_name: str) -> str:
     for tool in tools:
@@ -35,6 +38,30 @@ def format_tool_result(tool_name: str, tool_description: str, result: Any) -> Di
     }
 
 
+def aggregate_tool_results(formatted_results: list[Dict]) -> Dict:
+    """
+    Merge several `format_tool_result` dicts into one of the same shape.
+    The individual results are kept under "calls"; the aggregate is an error
+    only when every call failed.
+    """
+    return {
+        "tool_name": ", ".join(r["tool_name"] for r in formatted_results),
+        "tool_description": "\n".join(f"{r['tool_name']}: {r['tool_description']}" for r in formatted_results),
+        "output_text": "\n\n".join(f"[{r['tool_name']}]\n{r['output_text']}" for r in formatted_results),
+        "raw_output": [r["raw_output"] for r in formatted_results],
+        "isError": all(r["isError"] for r in formatted_results),
+        "calls": formatted_results
+    }
+
+
+def default_request_options() -> dict[str, Any]:
+    """
+    Model options applied to every request unless overridden per call.
+    """
+    options: dict[str, Any] = {}
+    if config_manager.OLLAMA_NUM_CTX > 0:
+        options["num_ctx"] = config_manager.OLLAMA_NUM_CTX
+    return options
 
 
 # === Global tool registry ===
@@ -55,18 +82,92 @@ class OllamaAgent:
         self,
         tools: list[dict],
         tool_impl: dict[str, Any],
-        model: str = "mistral-nemo"
+        model: str = "mistral-nemo",
+        backend: Optional[OllamaBackend] = None,
+        options: Optional[dict[str, Any]] = None,
+        keep_alive: Optional[int | str] = None,
+        hedge_after: Optional[float] = None,
+        hedge_model: Optional[str] = None
     ) -> None:
-        self.client = ollama.Client()
+        """
+        :param options: Default Ollama model options (num_ctx, temperature, top_k...).
+                        Defaults to the configured OLLAMA_NUM_CTX.
+        :param keep_alive: How long the server keeps the model loaded after a request.
+                           Defaults to the configured OLLAMA_KEEP_ALIVE.
+        :param hedge_after: Seconds without an answer after which `run` sends a duplicate
+                            request (0 disables hedging). Defaults to HEDGE_AFTER_MS.
+        :param hedge_model: Model answering the duplicate request. Defaults to HEDGE_MODEL,
+                            or the agent's own model (routed to another host by a backend pool).
+        """
+        self.backend = backend or ollama_backend
         self.model = model
         self.tools = tools
         self.tool_impl = tool_impl
+        self.options = {**default_request_options(), **(options or {})}
+        self.keep_alive = keep_alive if keep_alive is not None else parse_keep_alive(config_manager.OLLAMA_KEEP_ALIVE)
+        self.hedge_after = hedge_after if hedge_after is not None else config_manager.HEDGE_AFTER_MS / 1000
+        self.hedge_model = hedge_model or config_manager.HEDGE_MODEL or model
+
+    def request_options(self, options: Optional[dict[str, Any]] = None, format: Optional[str | dict] = None) -> dict[str, Any]:
+        """
+        🔹 Build the extra chat() arguments for one request: the agent's default
+        options overridden by `options` (None values are dropped), keep_alive,
+        and the structured output `format` ("json" or a JSON schema) when given.
+        """
+        merged = {k: v for k, v in {**self.options, **(options or {})}.items() if v is not None}
+        kwargs: dict[str, Any] = {}
+        if merged:
+            kwargs["options"] = merged
+        if self.keep_alive is not None:
+            kwargs["keep_alive"] = self.keep_alive
+        if format:
+            kwargs["format"] = format
+        return kwargs
+
+    async def _chat(self, messages: list[dict], tools: list[dict], **kwargs: Any) -> tuple[Any, Optional[str]]:
+        """
+        🔹 Send one chat request. With hedging enabled, a duplicate request goes out
+        after `hedge_after` seconds without an answer; the first successful answer
+        wins and the other request is cancelled.
+
+        :return: The response, and which request answered ("primary" or "hedge")
+                 when a hedge was sent (None otherwise).
+        """
+        def call(model: str):
+            return self.backend.chat(model=model, messages=messages, tools=tools, **kwargs)
+
+        if not self.hedge_after or self.hedge_after <= 0:
+            return await call(self.model), None
+
+        tasks = {asyncio.create_task(call(self.model)): "primary"}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                logger.info(f"🪁 No answer from '{self.model}' after {self.hedge_after:.1f}s, hedging with '{self.hedge_model}'.")
+                tasks[asyncio.create_task(call(self.hedge_model))] = "hedge"
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), (tasks[task] if len(tasks) > 1 else None)
+                    error = error or task.exception()
+            raise error
+        finally:
+            # The loser (or every request, if we are cancelled) stops here
+            for task in tasks:
+                task.cancel()
 
     async def run(
         self,
         content: str = None,
         messages: list[dict] = None,
-        add_tools: bool = False
+        add_tools: bool = False,
+        options: Optional[dict[str, Any]] = None,
+        format: Optional[str | dict] = None,
+        timeout: Optional[float] = None
     ) -> dict:
         """
         🔹 Run a query through the Ollama model, optionally invoking tools.
@@ -74,8 +175,26 @@ class OllamaAgent:
         :param content: Simple user message to send.
         :param messages: Full message history to send.
         :param add_tools: If True, includes tools in the request.
-        :return: Dict with tool, args, and result or answer.
+        :param options: Per-request model options (e.g. sampling settings).
+        :param format: Constrain the answer to JSON ("json") or to a JSON schema.
+        :param timeout: Seconds for the model call and the tool calls it triggers,
+                        capped by the caller's deadline.
+        :return: Dict with tool, args, and result or answer. When the model suggests
+                 several tool calls they run concurrently and their results are aggregated.
+                 A tool call that fails or runs out of time gives an error result.
+        :raises DeadlineExceeded: When the model call runs out of time.
         """
+        with deadline_scope(timeout):
+            return await self._run(content, messages, add_tools, options, format)
+
+    async def _run(
+        self,
+        content: Optional[str],
+        messages: Optional[list[dict]],
+        add_tools: bool,
+        options: Optional[dict[str, Any]],
+        format: Optional[str | dict]
+    ) -> dict:
         try:
             logger.info(f"📡 Calling Ollama model '{self.model}'")
 
@@ -86,38 +205,28 @@ class OllamaAgent:
 
             logger.debug(f"📝 Messages: {[m['content'] for m in messages]}")
 
-            response = self.client.chat(
-                model=self.model,
-                messages=messages,
-                tools=self.tools if add_tools else []
-            )
-            tool_call = response.message.tool_calls[0] if response.message.tool_calls else None
-            # Handle tool suggestion
-            if tool_call:
-                tool_name = tool_call.function.name
-                
-                tool_args = tool_call.function.arguments
-                logger.info(f"✅ Tool suggested: {tool_name} | Args: {tool_args}")
-
-                # Skip if any required arg is missing
-                if any(not v for v in tool_args.values()):
-                    return  "Skipped: missing arguments"
-                
-                # Call tool implementation
-                tool_fn = self.tool_impl.get(tool_name)
-                tool_description = get_tool_description(self.tools, tool_name)
-            
-
-                
-                result = await tool_fn(**tool_args) if callable(tool_fn) else None
-                logger.info(f"✅ Tool results: {result}")
-                formatted_result = format_tool_result(tool_name, tool_description, result)
-
-                return formatted_result
+            with span("llm.chat", model=self.model, tools=add_tools) as chat_span:
+                response, answered_by = await wait_within(
+                    self._chat(messages, self.tools if add_tools else [], **self.request_options(options, format)),
+                    what=f"Ollama call to '{self.model}'"
+                )
+                if chat_span and answered_by:
+                    chat_span.attributes["hedge"] = answered_by
+            tool_calls = response.message.tool_calls or []
+            # Handle tool suggestion: one call returns its result, several an aggregate
+            if len(tool_calls) == 1:
+                return await self._call_tool(tool_calls[0])
+
+            if tool_calls:
+                logger.info(f"✅ {len(tool_calls)} tools suggested: {[c.function.name for c in tool_calls]}")
+                formatted_results = await asyncio.gather(*(self._call_tool(c) for c in tool_calls))
+                return aggregate_tool_results(list(formatted_results))
 
             # If no tool was called, return final answer
             return response.message.content.strip()
-           
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.exception("❌ Error during Ollama model execution or tool resolution")
             return {
@@ -126,16 +235,114 @@ class OllamaAgent:
                 "result": f"Error: {str(e)}"
             }
 
+    async def _call_tool(self, tool_call) -> Dict:
+        """
+        🔹 Execute a suggested tool call. Failures are returned as an error
+        result instead of raised, so they don't affect the step or the other calls.
+        """
+        tool_name = tool_call.function.name
+        tool_args = tool_call.function.arguments or {}
+        tool_description = get_tool_description(self.tools, tool_name)
+        logger.info(f"✅ Tool suggested: {tool_name} | Args: {tool_args}")
+
+        if any(not v for v in tool_args.values()):
+            result = {"content": [{"type": "text", "text": "Skipped: missing arguments"}], "isError": True}
+            return format_tool_result(tool_name, tool_description, result)
+
+        tool_fn = self.tool_impl.get(tool_name)
+        try:
+            with span("tool.call", tool=tool_name):
+                result = await wait_within(tool_fn(**tool_args), what=f"Tool '{tool_name}'") if callable(tool_fn) else None
+            logger.info(f"✅ Tool results: {result}")
+        except Exception as e:
+            logger.error(f"❌ Tool '{tool_name}' failed: {e}")
+            result = {"content": [{"type": "text", "text": f"Error: {e}"}], "isError": True}
+        return format_tool_result(tool_name, tool_description, result)
+
+    async def stream(
+        self,
+        content: str = None,
+        messages: list[dict] = None,
+        options: Optional[dict[str, Any]] = None,
+        format: Optional[str | dict] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        🔹 Stream a plain answer from the Ollama model, token chunk by token chunk.
+        Tools are not offered: tool calls are only resolved through `run`.
+
+        :param content: Simple user message to send.
+        :param messages: Full message history to send.
+        :param options: Per-request model options (e.g. sampling settings).
+        :param format: Constrain the answer to JSON ("json") or to a JSON schema.
+        :param timeout: Seconds for the whole stream.
+        :return: Async iterator over the generated text chunks.
+        :raises DeadlineExceeded: When the stream doesn't finish in time.
+        """
+        logger.info(f"📡 Streaming from Ollama model '{self.model}'")
+
+        if messages is None:
+            if not content:
+                raise ValueError("Either 'content' or 'messages' must be provided.")
+            messages = [{"role": "user", "content": content}]
+
+        logger.debug(f"📝 Messages: {[m['content'] for m in messages]}")
+
+        # Not activated: the generator suspends at every chunk, so nothing nests under it
+        stream_span = start_span("llm.stream", model=self.model)
+        # A Deadline rather than a scope: the context can't be narrowed across yields
+        deadline = Deadline(timeout)
+        chunk_count = 0
+        error = None
+        try:
+            async with aclosing(self.backend.chat_stream(model=self.model, messages=messages, **self.request_options(options, format))) as chunks:
+                while True:
+                    try:
+                        chunk = await wait_within(anext(chunks), deadline.remaining(), what=f"Ollama stream from '{self.model}'")
+                    except StopAsyncIteration:
+                        break
+                    if chunk.message and chunk.message.content:
+                        chunk_count += 1
+                        yield chunk.message.content
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if stream_span:
+                stream_span.attributes["chunks"] = chunk_count
+                stream_span.end(error=error)
+
 
 # === Wrap MCP tool into Ollama-compatible schema ===
-async def _wrap_mcp_tool_as_ollama_tools(session, tool) -> dict:
+async def _wrap_mcp_tool_as_ollama_tools(server: MCPServer, tool) -> dict:
     """
     Convert an MCP tool to Ollama-compatible tool schema and register its executor.
+    The executor resolves the server's current session on each call, so it keeps
+    working after the pool restarts the server. Results are cached for the TTL
+    declared under the server's "cacheTtl" entry in the MCP config.
     """
+    cache_ttl = float((server.config.get("cacheTtl") or {}).get(tool.name, 0))
+
     async def async_wrapper(**kwargs):
-        return await session.call_tool(tool.name, arguments=kwargs)
+        with span("mcp.call_tool", server=server.name, tool=tool.name) as tool_span:
+            if cache_ttl <= 0:
+                return await server.call_tool(tool.name, arguments=kwargs)
+
+            cache_key = tool_result_cache.make_key(server.name, tool.name, kwargs)
+            hit, result = tool_result_cache.get(cache_key)
+            if tool_span:
+                tool_span.attributes["cache"] = "hit" if hit else "miss"
+            if hit:
+                logger.info(f"♻️ Tool cache hit: {tool.name} | Args: {kwargs}")
+                return result
+
+            result = await server.call_tool(tool.name, arguments=kwargs)
+            if not getattr(result, "isError", False):
+                tool_result_cache.put(cache_key, result, cache_ttl)
+            return result
 
     # Register tool
+    async_wrapper.server_name = server.name
     tool_impl_global[tool.name] = async_wrapper
 
     schema = {
@@ -147,24 +354,60 @@ async def _wrap_mcp_tool_as_ollama_tools(session, tool) -> dict:
         }
     }
 
+    # Replace any schema registered by an earlier start of the same tool
+    tools_json_schema_global[:] = [
+        t for t in tools_json_schema_global
+        if t["function"]["name"] != tool.name
+    ]
     tools_json_schema_global.append(schema)
     return schema
 
 
-# === Construct agent and tool client ===
-async def get_ollama_ai_agent(llm_model) -> tuple[MCPClient, OllamaAgent]:
+def _unregister_mcp_tool(server: MCPServer, schema: dict) -> None:
+    """
+    Drop a tool of a server that went down, so agents stop calling it on a dead session.
+    Leaves the tool alone if another server has registered the same name since.
+    """
+    name = schema["function"]["name"]
+    if getattr(tool_impl_global.get(name), "server_name", None) != server.name:
+        return
+    del tool_impl_global[name]
+    tools_json_schema_global[:] = [t for t in tools_json_schema_global if t["function"]["name"] != name]
+
+
+# === Process-wide MCP server pool ===
+mcp_pool: MCPServerPool[dict] = MCPServerPool(
+    server_class=MCPServer,
+    tool_wrapper=_wrap_mcp_tool_as_ollama_tools,
+    tool_remover=_unregister_mcp_tool,
+    health_check_interval=config_manager.MCP_HEALTH_CHECK_INTERVAL
+)
+
+
+@asynccontextmanager
+async def mcp_pool_lifespan(app: Any = None):
+    """
+    App lifespan hook: warm up the MCP server pool at startup; at exit, shut it
+    down and close the pooled Ollama HTTP connections.
+    """
+    warmup = asyncio.create_task(mcp_pool.get_tools())
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+        await mcp_pool.shutdown()
+        await ollama_backend.aclose()
+
+
+# === Construct agent from the shared tool pool ===
+async def get_ollama_ai_agent(llm_model) -> OllamaAgent:
     """
-    Load tools from MCP servers and return an initialized OllamaAgent.
+    Return an OllamaAgent wired to the tools of the shared MCP server pool.
+    The pool is started on first use and stays up until application exit.
 
     :param llm_model: The name of the Ollama model to use.
-    :return: A tuple of (MCPClient, OllamaAgent)
+    :return: An initialized OllamaAgent
     """
-    client = MCPClient(
-        server_class=MCPServer,
-        tool_wrapper=_wrap_mcp_tool_as_ollama_tools
-    )
-    client.load_servers()
-    tools = await client.start()
-    agent = OllamaAgent(tools=tools, tool_impl=tool_impl_global, model=llm_model)
-
-    return client, agent
+    tools = await mcp_pool.get_tools()
+    return OllamaAgent(tools=list(tools), tool_impl=tool_impl_global, model=llm_model)
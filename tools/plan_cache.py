@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+from core import logger, config_manager, SCRIPT_DIR
+
+
+def _digest(payload: Any) -> str:
+    """Stable SHA-256 of a JSON-serializable payload."""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class PlanCache:
+    """
+    🔹 PlanCache: Persistent SQLite cache of validated reasoning plans.
+
+    Responsibilities:
+    - Store sanitized plans under a hash of model, rendered prompt, tools and sampling options.
+    - Drop every entry when the prompt template or the tool set changes.
+    - Keep at most `max_entries` plans, evicting the least recently used.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 500) -> None:
+        """
+        :param path: SQLite database file. Relative paths are resolved from the project root.
+        :param max_entries: Maximum number of cached plans.
+        """
+        path = Path(path)
+        self.path = path if path.is_absolute() else SCRIPT_DIR / path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict], tools: list[dict], options: dict) -> str:
+        """
+        Hash every input that determines the generated plan.
+        """
+        return _digest({"model": model, "messages": messages, "tools": tools, "options": options})
+
+    @staticmethod
+    def make_fingerprint(template_fingerprint: str, tools: list[dict]) -> str:
+        """
+        Hash the prompt template's fingerprint and the tool set; a new value invalidates the cache.
+        """
+        return _digest({"template": template_fingerprint, "tools": tools})
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS plans (
+                       key TEXT PRIMARY KEY,
+                       fingerprint TEXT NOT NULL,
+                       plan TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       last_used_at REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used_at)")
+            self._conn.commit()
+            logger.debug(f"🗄️ Plan cache opened at: {self.path}")
+        return self._conn
+
+    def _invalidate_stale(self, conn: sqlite3.Connection, fingerprint: str) -> None:
+        if fingerprint == self._fingerprint:
+            return
+        deleted = conn.execute("DELETE FROM plans WHERE fingerprint != ?", (fingerprint,)).rowcount
+        conn.commit()
+        if deleted:
+            logger.info(f"🧹 Plan cache invalidated {deleted} plan(s) after a prompt or tool change.")
+        self._fingerprint = fingerprint
+
+    def _get(self, key: str, fingerprint: str) -> Optional[dict]:
+        with self._lock:
+            conn = self._connect()
+            self._invalidate_stale(conn, fingerprint)
+            row = conn.execute("SELECT plan FROM plans WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE plans SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return json.loads(row[0])
+
+    def _put(self, key: str, fingerprint: str, plan: dict) -> None:
+        with self._lock:
+            conn = self._connect()
+            self._invalidate_stale(conn, fingerprint)
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (key, fingerprint, plan, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, json.dumps(plan), now, now)
+            )
+            conn.execute(
+                """DELETE FROM plans WHERE key IN (
+                       SELECT key FROM plans ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    async def get(self, key: str, fingerprint: str) -> Optional[dict]:
+        """
+        Return the cached plan for `key`, or None. Errors are logged and treated as a miss.
+        """
+        try:
+            return await asyncio.to_thread(self._get, key, fingerprint)
+        except Exception as e:
+            logger.warning(f"⚠️ Plan cache lookup failed: {e}")
+            return None
+
+    async def put(self, key: str, fingerprint: str, plan: dict) -> None:
+        """
+        Store a validated plan. Errors are logged and ignored.
+        """
+        try:
+            await asyncio.to_thread(self._put, key, fingerprint, plan)
+        except Exception as e:
+            logger.warning(f"⚠️ Plan cache write failed: {e}")
+
+
+# ✅ Shared on-disk plan cache
+plan_cache = PlanCache(
+    path=config_manager.PLAN_CACHE_PATH,
+    max_entries=config_manager.PLAN_CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,269 @@
+import json
+import re
+from typing import Any, Literal
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator, model_validator
+
+_FENCED_JSON = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([\]}])")
+
+
+class ReasoningStep(BaseModel):
+    """
+    One step of a reasoning plan.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    step_id: int
+    step_type: Literal["tool_use", "inference", "assumption"]
+    description: str = Field(min_length=1)
+    dependencies: list[int] = Field(default_factory=list)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _fix_known_typos(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "infferred_facts" in data:
+            data = {**data, "inferred_facts": data["infferred_facts"]}
+            data.pop("infferred_facts")
+        return data
+
+    @field_validator("dependencies", mode="before")
+    @classmethod
+    def _null_dependencies(cls, value: Any) -> Any:
+        return [] if value is None else value
+
+
+class ReasoningPlan(BaseModel):
+    """
+    Reasoning plan generated by the LLM; its JSON schema constrains generation.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    original_question: str = ""
+    intent: str = ""
+    reasoning_steps: list[ReasoningStep] = Field(min_length=1)
+    final_output_format: str = ""
+
+    @field_validator("original_question", "intent", "final_output_format", mode="before")
+    @classmethod
+    def _null_to_empty(cls, value: Any) -> Any:
+        return "" if value is None else value
+
+    @field_validator("reasoning_steps", mode="before")
+    @classmethod
+    def _drop_empty_steps(cls, steps: Any) -> Any:
+        # Models sometimes pad plans with placeholder steps that have no id or description
+        if isinstance(steps, list):
+            return [
+                step for step in steps
+                if not isinstance(step, dict) or (step.get("description") is not None and step.get("step_id"))
+            ]
+        return steps
+
+
+# ✅ Sent as Ollama's `format` so the server constrains decoding to a valid plan
+PLAN_JSON_SCHEMA: dict = ReasoningPlan.model_json_schema()
+
+
+class PlanValidationError(ValueError):
+    """
+    Raised when a model response is not a valid reasoning plan (or batch of step results).
+    `details` lists what is wrong, in a form that can be sent back to the model.
+    """
+
+    def __init__(self, message: str, details: list[str] | None = None) -> None:
+        super().__init__(message)
+        self.details = details or [message]
+
+
+def _describe(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(p) for p in e['loc']) or 'plan'}: {e['msg']}"
+        for e in error.errors(include_url=False)
+    ]
+
+
+def _is_json_error(error: ValidationError) -> bool:
+    return any(e["type"] == "json_invalid" for e in error.errors(include_url=False))
+
+
+def repair_json_text(text: str) -> str:
+    """
+    Cheap fixes for the usual ways models wrap or break JSON: code fences,
+    prose around the object and trailing commas.
+    """
+    match = _FENCED_JSON.search(text)
+    if match:
+        text = match.group(1)
+    else:
+        start, end = text.find("{"), text.rfind("}")
+        if start != -1 and end > start:
+            text = text[start:end + 1]
+    return _TRAILING_COMMA.sub(r"\1", text)
+
+
+def parse_plan(raw: Any) -> ReasoningPlan:
+    """
+    Parse and validate a plan in one pass; fall back to a textual repair
+    only when the response isn't valid JSON.
+
+    :raises PlanValidationError: With details to feed a repair request.
+    """
+    if not isinstance(raw, str):
+        raise PlanValidationError(f"The model did not return text: {raw!r}")
+    try:
+        return ReasoningPlan.model_validate_json(raw)
+    except ValidationError as e:
+        if not _is_json_error(e):
+            raise PlanValidationError("The plan does not match the schema.", _describe(e)) from e
+
+    repaired = repair_json_text(raw)
+    try:
+        return ReasoningPlan.model_validate_json(repaired)
+    except ValidationError as e:
+        raise PlanValidationError("The plan is not valid JSON.", _describe(e)) from e
+
+
+class IncrementalStepParser:
+    """
+    🔹 IncrementalStepParser: Emits plan steps while the plan JSON is still streaming.
+
+    Responsibilities:
+    - Track strings, escapes and nesting of the streamed text character by character.
+    - Capture each object of the top-level `reasoning_steps` array as soon as it closes.
+    - Return the steps that are complete and valid; anything else is left to parse_plan.
+    """
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string: list[str] = []
+        self._last_key: str | None = None
+        self._expect_steps = False
+        self._steps_depth: int | None = None
+        self._step: list[str] | None = None
+        self._step_depth = 0
+        self._seen: set[int] = set()
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Consume the next piece of the response.
+
+        :return: Steps (as dicts) completed by this chunk, in plan order.
+        """
+        completed = []
+        for char in chunk:
+            if self._step is not None:
+                self._step.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._step is None and self._depth == 1:
+                        self._last_key = "".join(self._string)
+                else:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char == ":":
+                self._expect_steps = self._depth == 1 and self._last_key == "reasoning_steps"
+            elif char == "[":
+                self._depth += 1
+                if self._expect_steps and self._steps_depth is None:
+                    self._steps_depth = self._depth
+                self._expect_steps = False
+            elif char == "{":
+                self._depth += 1
+                if self._step is None and self._steps_depth is not None and self._depth == self._steps_depth + 1:
+                    self._step = ["{"]
+                    self._step_depth = self._depth
+            elif char in "}]":
+                if self._step is not None and char == "}" and self._depth == self._step_depth:
+                    step = self._complete("".join(self._step))
+                    if step is not None:
+                        completed.append(step)
+                    self._step = None
+                if char == "]" and self._depth == self._steps_depth:
+                    self._steps_depth = -1  # array closed; ignore any later arrays
+                self._depth -= 1
+            elif not char.isspace() and char != ",":
+                self._expect_steps = False
+        return completed
+
+    def _complete(self, text: str) -> dict | None:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        # Same filter as ReasoningPlan, so early steps match the validated plan
+        if not isinstance(data, dict) or data.get("description") is None or not data.get("step_id"):
+            return None
+        try:
+            step = ReasoningStep.model_validate(data).model_dump()
+        except ValidationError:
+            return None
+        if step["step_id"] in self._seen:
+            return None
+        self._seen.add(step["step_id"])
+        return step
+
+
+def build_repair_messages(messages: list[dict], raw: Any, error: PlanValidationError) -> list[dict]:
+    """
+    Follow-up request asking the model to fix its previous plan instead of starting over.
+    """
+    problems = "\n".join(f"- {d}" for d in error.details)
+    return messages + [
+        {"role": "assistant", "content": raw if isinstance(raw, str) else str(raw)},
+        {"role": "user", "content": f"Your reasoning plan is invalid:\n{problems}\n"
+                                    f"Reply with the corrected plan as a single JSON object only."}
+    ]
+
+
+def build_batch_schema(step_ids: list[int]) -> dict:
+    """
+    JSON schema for a batched step execution: one non-empty string result per step_id.
+    """
+    keys = [str(step_id) for step_id in step_ids]
+    return {
+        "type": "object",
+        "properties": {key: {"type": "string", "minLength": 1} for key in keys},
+        "required": keys
+    }
+
+
+def parse_batch_results(raw: Any, step_ids: list[int]) -> dict[int, str]:
+    """
+    Results of a batched step execution keyed by step_id.
+
+    :raises PlanValidationError: When the response isn't JSON or misses a step result.
+    """
+    if not isinstance(raw, str):
+        raise PlanValidationError(f"The model did not return text: {raw!r}")
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_json_text(raw))
+        except json.JSONDecodeError as e:
+            raise PlanValidationError("The batched results are not valid JSON.", [str(e)]) from e
+    if not isinstance(data, dict):
+        raise PlanValidationError("The batched results are not a JSON object.")
+
+    missing = [
+        step_id for step_id in step_ids
+        if not isinstance(data.get(str(step_id)), str) or not data[str(step_id)].strip()
+    ]
+    if missing:
+        raise PlanValidationError(
+            "The batched results miss some steps.",
+            [f"{step_id}: missing or empty result" for step_id in missing]
+        )
+    return {step_id: data[str(step_id)].strip() for step_id in step_ids}
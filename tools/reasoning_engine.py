@@ -1,8 +1,18 @@
 import asyncio
 import os
-from typing import AsyncGenerator, Dict, Any
-from core import logger,config_manager,load_simulation_prompt,extract_json_from_response
-from .ollama_mcp_client import OllamaAgent
+from typing import AsyncGenerator, Dict, Any, Optional
+from core import logger,config_manager,get_prompt_template,SCRIPT_DIR
+from core import Trace, span, start_trace, end_trace, activate, Deadline
+from .ollama_mcp_client import OllamaAgent, mcp_pool
+from .step_scheduler import StepScheduler
+from .tool_cache import tool_result_cache
+from .plan_cache import PlanCache, plan_cache
+from .context_builder import context_builder
+from .final_answer import derive_final_answer
+from .plan_parser import (
+    PLAN_JSON_SCHEMA, IncrementalStepParser, PlanValidationError, parse_plan, build_repair_messages,
+    build_batch_schema, parse_batch_results
+)
 
 
 
@@ -22,29 +32,133 @@ def serialize_response(obj):
         return str(obj)
     return f"<<Unserializable: {type(obj).__name__}>>"
 
-def sanitize_reasoning_steps(steps):
+# Identical for every call of a run, so Ollama can reuse the evaluated prompt prefix
+AGENT_SYSTEM_PROMPT = (
+    "You simulate step-by-step reasoning like an LLM would internally: a reasoning plan "
+    "is defined, its steps are executed one by one and a final answer is given to the user question."
+)
+
+def build_shared_prefix(user_question: str) -> list[dict]:
+    """Leading messages shared by the plan, step and final-answer calls of a run."""
     return [
-        step for step in steps
-        if step.get("description") is not None and step.get("step_id")
+        {"role": "system", "content": AGENT_SYSTEM_PROMPT},
+        {"role": "user", "content": f"The user original question is {user_question}"}
+    ]
+
+def build_plan_messages(reasoning_prompt: str, user_question: str) -> list[dict]:
+    """Build the chat messages used to generate the reasoning plan."""
+    return build_shared_prefix(user_question) + [
+        {"role": "user", "content": reasoning_prompt}
+    ]
+
+def build_step_context(step: dict, dependency_results: list) -> tuple[str, dict]:
+    """Budgeted context block from the results of a step's dependencies."""
+    dependency_ids = [d for d in step.get("dependencies") or [] if d != step["step_id"]]
+    labels = [f"Step {d}" for d in dependency_ids] if len(dependency_ids) == len(dependency_results) else [""] * len(dependency_results)
+    return context_builder.build(zip(labels, dependency_results))
+
+def build_step_messages(step: dict, context: str, user_question: str) -> list[dict]:
+    """
+    Build the chat messages used to execute a single reasoning step.
+    Dependency context comes before the task, so steps with the same
+    dependencies also share it as prefix.
+    """
+    description = step["description"]
+    return build_shared_prefix(user_question) + [
+        {"role": "user", "content": f"Previous steps from the process provided you the following context:\n{context}\n\n"
+                                    f"Execute the following task in order to provide context for the following steps of the reasoning process: {description}"}
     ]
 
-def extract_text_from_serialized_result(serialized_result: dict) -> str:
+def build_batch_messages(steps: list[dict], context: str, user_question: str) -> list[dict]:
+    """
+    Build the chat messages used to execute several inference steps in one call.
+    The answer is a JSON object mapping each step_id to that step's result.
+    """
+    tasks = "\n".join(f"- Step {step['step_id']}: {step['description']}" for step in steps)
+    return build_shared_prefix(user_question) + [
+        {"role": "user", "content": f"Previous steps from the process provided you the following context:\n{context}\n\n"
+                                    f"Execute each of the following independent tasks in order to provide context for the "
+                                    f"following steps of the reasoning process:\n{tasks}\n\n"
+                                    f"Reply with a JSON object mapping each step number to the result of its task."}
+    ]
+
+def is_batchable_step(step: dict) -> bool:
+    """Inference steps need no tools, so several of them can be answered in one call."""
+    return step["step_type"] != "tool_use"
+
+def build_final_messages(context: str, user_question: str) -> list[dict]:
+    """Build the chat messages used to generate the final answer."""
+    return build_shared_prefix(user_question) + [
+        {"role": "user", "content": f"To answer the question you can use the following context:\n{context}\n\n"
+                                    f"Provide just the answer to the question."}
+    ]
+
+def build_sampling_options(top_k: Optional[float], top_p: Optional[float], temperature: Optional[float]) -> dict:
+    """Ollama sampling options from the UI settings (top_k must be an integer)."""
+    options = {
+        "top_k": int(top_k) if top_k is not None else None,
+        "top_p": top_p,
+        "temperature": temperature
+    }
+    return {k: v for k, v in options.items() if v is not None}
+
+def _write_trace(trace: Trace, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    trace.export(path)
+
+
+async def export_trace(trace: Trace) -> None:
+    """
+    Append the trace to TRACE_EXPORT_PATH (OTLP/JSON lines) when configured.
+    Serialization and the file write run in a worker thread, off the event loop.
+    """
+    path = config_manager.TRACE_EXPORT_PATH
+    if not path:
+        return
+    if not os.path.isabs(path):
+        path = os.path.join(SCRIPT_DIR, path)
     try:
-        content_list = serialized_result.get("output", {}).get("content", [])
-        # Unisci solo i testi dei blocchi di tipo 'text'
-        texts = [item["text"] for item in content_list if item.get("type") == "text"]
-        return "\n".join(texts)
+        await asyncio.to_thread(_write_trace, trace, path)
     except Exception as e:
-        logger.error(f"Error extracting text from serialized results :\n{e}")
-        return "[Error extracting text]"
-
+        logger.warning(f"⚠️ Failed to export trace to {path}: {e}")
 
 
 
 # 🚀 Main reasoning pipeline
-async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top_k: float, top_p: float, temperature: float) -> AsyncGenerator[Dict[str, Any], None]:
+async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top_k: float, top_p: float, temperature: float, max_parallel_steps: Optional[int] = None, stream: Optional[bool] = None) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Run the reasoning pipeline and yield events for the chat and debug views.
+
+    Every event carries a "chat" message. Events for a completed stage also carry
+    a "debug" payload; when streaming is enabled, partial generations are
+    yielded as events with a "stream" payload (phase, step, delta) instead.
+    Debug payloads carry the timing spans finished since the previous debug
+    event; the last one also carries a "timing" summary of the whole run.
+
+    The run has a PIPELINE_TIMEOUT deadline; each plan, step and final call gets
+    its own budget (PLAN_TIMEOUT, STEP_TIMEOUT, FINAL_TIMEOUT) capped by what's left.
+
+    When the plan is streamed, steps start as soon as their JSON object is
+    complete and their dependencies are met; they are cancelled if the
+    finished plan turns out to be invalid or different.
+    """
+    if stream is None:
+        stream = config_manager.ENABLE_STREAMING
     reasoning_state = {"question": user_question, "model": llm_agent.model}
     results = {}
+    sampling_options = build_sampling_options(top_k, top_p, temperature)
+    trace = start_trace("pipeline.run", model=llm_agent.model)
+    run_deadline = Deadline(config_manager.PIPELINE_TIMEOUT)
+    scheduler: Optional[StepScheduler] = None
+
+    def traced(event: Dict[str, Any], final: bool = False) -> Dict[str, Any]:
+        if final:
+            trace.finish()
+        if "debug" in event:
+            event["debug"]["spans"] = trace.drain()
+            if final:
+                event["debug"]["timing"] = trace.summary()
+        return event
 
     try:
         #
@@ -52,7 +166,7 @@ async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top
         #
         reasoning_prompt = f"Generating reasoning prompt for: {user_question}"
         reasoning_state["reasoning_prompt"] = reasoning_prompt
-        yield { "chat": "🚀 Generating Reasoning Prompt...", 
+        yield traced({ "chat": "🚀 Generating Reasoning Prompt...", 
                 "debug": 
                     {   "step": 1, 
                         "title": "Setting up", 
@@ -60,59 +174,88 @@ async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top
                         "css_class" : "generation-step",
                         "rendered_prompt": reasoning_prompt
                     }
-                }
+                })
         path = os.path.join(config_manager.CONFIG_FOLDER_PATH, config_manager.PROMPT_FILE_NAME)
-        prompt_template = load_simulation_prompt(path)
-        
-        
-        if llm_agent.tools:
-            available_tools = "\n".join(
-                f"{tool['function']['name']} : {tool['function']['description']}"
-                for tool in llm_agent.tools
-            )
-        else:
-            available_tools = "No tools available at this time."
-
-            
-        if "{{ user_input }}" not in prompt_template:
-            raise ValueError("Reasoning prompt template missing '{{ user_input }}' placeholder.")
-
-        if "{{ available_tools }}" not in prompt_template:
-            raise ValueError("Reasoning prompt template missing '{{ available_tools }}' placeholder.")
-        
-        reasoning_prompt = prompt_template.replace("{{ user_input }}", user_question)
-        reasoning_prompt = reasoning_prompt.replace("{{ available_tools }}", available_tools)
-
-
+        with span("pipeline.prompt"):
+            template = get_prompt_template(path)
+            reasoning_prompt = template.render(user_question, llm_agent.tools)
 
         logger.debug(f"Prepared reasoning prompt:\n{reasoning_prompt}")
         
         reasoning_state["reasoning_prompt"] = reasoning_prompt
-        
-        await asyncio.sleep(1)
-        
-        yield   {   "chat": "✅ Reasoning prompt generated successfully.", 
-                    "debug": 
-                        {
-                            "step": 1, 
-                            "title": "Prompt Ready", 
-                            "emoji" : "✅",
-                            "css_class" : "generation-step",
-                            "rendered_prompt": reasoning_prompt
-                        }
-            }
-            
-        await asyncio.sleep(1)
+        prompt_debug = {
+            "step": 1,
+            "title": "Prompt Ready",
+            "emoji" : "✅",
+            "css_class" : "generation-step",
+            "rendered_prompt": reasoning_prompt
+        }
+        # Tool servers that failed to start: their tools are missing from this run
+        degraded = mcp_pool.degraded
+        if degraded:
+            prompt_debug["degraded_tool_servers"] = degraded
+
+        yield traced({   "chat": "✅ Reasoning prompt generated successfully.", 
+                    "debug": prompt_debug
+            })
 
         #
         # 2. Generating reasoning plan using LLM (ollama)
         #
-        messages = [
-                {"role": "system", "content": "You simulate step-by-step reasoning like an LLM would internally."},
-                {"role": "user", "content": reasoning_prompt}
-            ]
+        # Steps can start while the plan is still streaming, so the scheduler exists first
+        async def execute_step(step: dict, dependency_results: list, report_progress) -> Any:
+            # Runs in its own task: the span stays active for the whole step
+            with span("pipeline.step", step_id=step["step_id"], step_type=step["step_type"]):
+                context, _ = build_step_context(step, dependency_results)
+                messages = build_step_messages(step, context, user_question)
+                add_tools = step["step_type"] == "tool_use"
+                if stream and not add_tools:
+                    chunks = []
+                    async for delta in llm_agent.stream(messages=messages, options=sampling_options, timeout=run_deadline.budget(config_manager.STEP_TIMEOUT)):
+                        chunks.append(delta)
+                        report_progress(delta)
+                    raw_response = "".join(chunks).strip()
+                else:
+                    raw_response = await llm_agent.run(messages=messages, add_tools=add_tools, options=sampling_options, timeout=run_deadline.budget(config_manager.STEP_TIMEOUT))
+            logger.info(f"✅ Raw response: {raw_response}")
+            return serialize_response(raw_response)
+
+        async def execute_batch(batch_steps: list[dict], dependency_results: list, progress_reporters: list) -> list:
+            step_ids = [step["step_id"] for step in batch_steps]
+            with span("pipeline.step.batch", step_ids=",".join(map(str, step_ids)), size=len(step_ids)):
+                context, _ = build_step_context(batch_steps[0], dependency_results)
+                raw_response = await llm_agent.run(
+                    messages=build_batch_messages(batch_steps, context, user_question),
+                    add_tools=False,
+                    options=sampling_options,
+                    format=build_batch_schema(step_ids),
+                    timeout=run_deadline.budget(config_manager.STEP_TIMEOUT)
+                )
+                try:
+                    batch_results = parse_batch_results(raw_response, step_ids)
+                except PlanValidationError as e:
+                    logger.warning(f"⚠️ Invalid batched results for steps {step_ids} ({'; '.join(e.details)}), executing them one by one.")
+                    return list(await asyncio.gather(*(
+                        execute_step(step, dependency_results, report_progress)
+                        for step, report_progress in zip(batch_steps, progress_reporters)
+                    )))
+            logger.info(f"✅ Batched results for steps {step_ids}: {batch_results}")
+            return [batch_results[step_id] for step_id in step_ids]
+
+        def make_scheduler() -> StepScheduler:
+            return StepScheduler(
+                execute_step,
+                max_concurrency=max_parallel_steps or config_manager.MAX_PARALLEL_STEPS,
+                first_index=3,
+                run_batch=execute_batch if config_manager.EXECUTION_MODE.lower() == "adaptive" else None,
+                batchable=is_batchable_step
+            )
 
-        yield   {   "chat": "🧠 Generating reasoning plan ...", 
+        scheduler = make_scheduler()
+
+        messages = build_plan_messages(reasoning_prompt, user_question)
+
+        yield traced({   "chat": "🧠 Generating reasoning plan ...", 
                     "debug": 
                         {
                             "step": 2, 
@@ -121,35 +264,95 @@ async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top
                             "css_class" : "generation-step",
                             "messages": messages
                         }
-                }
-
-        await asyncio.sleep(1)
+                })
    
+        plan_span = trace.start_span("pipeline.plan", parent=trace.root)
+        activate(plan_span)
         try:
-            raw_response = await llm_agent.run(messages=messages, add_tools=False)
-            response = extract_json_from_response(raw_response)
+            plan_cache_key = PlanCache.make_key(llm_agent.model, messages, llm_agent.tools, sampling_options)
+            plan_cache_fingerprint = PlanCache.make_fingerprint(template.fingerprint, llm_agent.tools)
+            response = None
+            if config_manager.ENABLE_PLAN_CACHE:
+                response = await plan_cache.get(plan_cache_key, plan_cache_fingerprint)
 
-            response = {
-                **response,
-                "reasoning_steps": sanitize_reasoning_steps(response.get("reasoning_steps", []))
-            }
+            plan_cache_status = "hit" if response is not None else "miss"
+            plan_span.attributes["plan_cache"] = plan_cache_status
+            plan_repairs = 0
+            if response is None:
+                if stream:
+                    chunks = []
+                    step_parser = IncrementalStepParser() if config_manager.ENABLE_EARLY_STEPS else None
+                    async for delta in llm_agent.stream(messages=messages, options=sampling_options, format=PLAN_JSON_SCHEMA, timeout=run_deadline.budget(config_manager.PLAN_TIMEOUT)):
+                        chunks.append(delta)
+                        # Start steps whose object is complete instead of waiting for the whole plan
+                        for step in step_parser.feed(delta) if step_parser else []:
+                            scheduler.add_step(step)
+                        yield {
+                            "chat": "🧠 Generating reasoning plan ...\n" + "".join(chunks),
+                            "stream": {"phase": "plan", "step": 2, "delta": delta}
+                        }
+                    raw_response = "".join(chunks)
+                else:
+                    raw_response = await llm_agent.run(messages=messages, add_tools=False, options=sampling_options, format=PLAN_JSON_SCHEMA, timeout=run_deadline.budget(config_manager.PLAN_TIMEOUT))
+
+                # Ask the model to fix an invalid plan rather than generating a new one from scratch
+                while True:
+                    try:
+                        plan = parse_plan(raw_response)
+                        break
+                    except PlanValidationError as e:
+                        if scheduler.steps:
+                            logger.warning(f"⚠️ Cancelling {len(scheduler.steps)} step(s) started from an invalid plan.")
+                            await scheduler.cancel()
+                            scheduler = make_scheduler()
+                        if plan_repairs >= config_manager.PLAN_MAX_REPAIRS:
+                            raise
+                        plan_repairs += 1
+                        logger.warning(f"⚠️ Invalid reasoning plan ({'; '.join(e.details)}), requesting repair {plan_repairs}.")
+                        yield {"chat": f"🔧 Repairing reasoning plan (attempt {plan_repairs}) ..."}
+                        with span("pipeline.plan.repair", attempt=plan_repairs):
+                            raw_response = await llm_agent.run(
+                                messages=build_repair_messages(messages, raw_response, e),
+                                add_tools=False,
+                                options=sampling_options,
+                                format=PLAN_JSON_SCHEMA,
+                                timeout=run_deadline.budget(config_manager.PLAN_TIMEOUT)
+                            )
+
+                response = plan.model_dump()
+                if config_manager.ENABLE_PLAN_CACHE:
+                    await plan_cache.put(plan_cache_key, plan_cache_fingerprint, response)
+
+            early_steps = scheduler.steps
+            if early_steps != response["reasoning_steps"][:len(early_steps)]:
+                logger.warning("⚠️ Validated plan differs from the streamed steps, restarting step execution.")
+                await scheduler.cancel()
+                scheduler = make_scheduler()
+                early_steps = []
+            plan_span.attributes["steps"] = len(response["reasoning_steps"])
+            plan_span.attributes["early_steps"] = len(early_steps)
+            plan_span.end()
+            activate(trace.root)
             reasoning_state["generated_plan"] = response
-            yield   {   "chat": "✅ Reasoning plan generated successfully.", 
+            yield traced({   "chat": "✅ Reasoning plan generated successfully.", 
                         "debug": 
                             {
                                 "step": 2, 
                                 "title": "Reasoning Plan Generated",
                                 "emoji" : "✅",
                                 "css_class" : "generation-step", 
+                                "plan_cache": plan_cache_status,
+                                "plan_repairs": plan_repairs,
+                                "early_steps": len(early_steps),
                                 "reasoning": response
                             }
-                    }
-            
-            await asyncio.sleep(1)
+                    })
 
         except Exception as e:
             logger.error("Failed to generate reasoning plan after retries.", exc_info=True)
-            yield   {   "chat": "❌ Failed to generate reasoning plan.", 
+            await scheduler.cancel()
+            plan_span.end(error=e)
+            yield traced({   "chat": "❌ Failed to generate reasoning plan.", 
                         "debug": 
                             {   "step": "Error", 
                                 "title": "Plan Generation Failed", 
@@ -158,7 +361,7 @@ async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top
                                 "error": str(e)
                             
                             }
-                    }
+                    }, final=True)
             return
 
         #
@@ -166,50 +369,53 @@ async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top
         #
         
         steps = reasoning_state["generated_plan"].get("reasoning_steps", [])
-        results = {}
+
         count_steps = 2
-        for step_index, step in enumerate(steps, start=3):
-            
-            step_id = step["step_id"]
-            description = step["description"]
-            type=step["step_type"]
-            dependencies = step.get("dependencies", [])
-        
-            # Get dependency outputs
-            dep_results = [
-                extract_text_from_serialized_result(results[d])
-                for d in dependencies if d in results
-            ]
-            context = "\n".join(dep_results)
-            
-            messages = [
-                {"role": "system", "content": f"You are an LLM agent that should execute the following task: {description} in order to provide context for the following steps of the reasoning process defined to answer the customer question."},
-                {"role": "system", "content": f"Previous steps from from the process provided you the following context: {context} "},
-                {"role": "user", "content": f"The user original question is {user_question}"}
-            ]
-            
-            emoji = "🛠️" if step["step_type"] == "tool_use" else "🧠"
-            yield {
-                    "chat": f"{emoji} Executing Reasoning step {step_index}: {description}",
-                    "debug": {
-                        "step": step_index,
-                        "title": "Executing reasoning step",
-                        "emoji": emoji,
-                        "type" : type,
-                        "description" : description,
-                        "messages": messages
-                    }
-                }
-            
-            await asyncio.sleep(1)
-            
-            add_tools = step["step_type"] == "tool_use"
-            try:
-                raw_response = await llm_agent.run(messages=messages, add_tools=add_tools)
-                logger.info(f"✅ Raw response: {raw_response}")
-                results[step_id] = serialize_response(raw_response)    
+        streamed_text = {}
+        steps_span = trace.start_span("pipeline.steps", parent=trace.root, steps=len(steps))
+        # Step tasks created from here on inherit this as their parent
+        activate(steps_span)
+        for step in steps[len(scheduler.steps):]:
+            scheduler.add_step(step)
+        scheduler.close()
+        async for event in scheduler.events():
+            step = event.step
+            step_index = event.index
+            type = step["step_type"]
+
+            if event.kind == "started":
+                description = step["description"]
+                emoji = "🛠️" if type == "tool_use" else "🧠"
+                context, context_stats = build_step_context(step, event.dependency_results)
+                if event.batch:
+                    batch_steps = [s for s in steps if s["step_id"] in event.batch]
+                    step_messages = build_batch_messages(batch_steps, context, user_question)
+                else:
+                    step_messages = build_step_messages(step, context, user_question)
+                yield traced({
+                        "chat": f"{emoji} Executing Reasoning step {step_index}: {description}",
+                        "debug": {
+                            "step": step_index,
+                            "title": "Executing reasoning step",
+                            "emoji": emoji,
+                            "type" : type,
+                            "description" : description,
+                            "messages": step_messages,
+                            "context": context_stats,
+                            **({"batch": event.batch} if event.batch else {})
+                        }
+                    })
 
+            elif event.kind == "progress":
+                streamed_text[step_index] = streamed_text.get(step_index, "") + event.progress
                 yield {
+                    "chat": f"🧠 Reasoning step {step_index}: {streamed_text[step_index]}",
+                    "stream": {"phase": "step", "step": step_index, "delta": event.progress}
+                }
+
+            elif event.kind == "completed":
+                streamed_text.pop(step_index, None)
+                yield traced({
                     "chat": f"✅ Reasoning step {step_index} executed.",
                     "debug": {
                         "step": step_index,
@@ -217,78 +423,110 @@ async def run_reasoning_pipeline(user_question: str, llm_agent: OllamaAgent, top
                         "type": type,
                         "emoji" : "✅",
                         "css_class" : "generation-step", 
-                        "output": serialize_response(raw_response)
+                        "output": event.result,
+                        **({"tool_cache": tool_result_cache.stats()} if type == "tool_use" else {})
                     }
-                }
-
-                await asyncio.sleep(1)
+                })
 
                 count_steps = count_steps + 1
-            except Exception as e:
-                logger.error("Failed to generate reasoning plan after retries.", exc_info=True)
-                yield   {   "chat": "❌ Failed to execute reasoning step.", 
+            else:
+                logger.error("Failed to execute reasoning step.", exc_info=event.error)
+                steps_span.end(error=event.error)
+                yield traced({   "chat": "❌ Failed to execute reasoning step.", 
                             "debug": 
                                 {   "step": "Error", 
                                     "title": "Execution Step Failed", 
                                     "emoji" : "❌",
                                     "css_class" : "error-step", 
-                                    "error": str(e)
+                                    "error": str(event.error)
                                 
                                 }
-                        }
+                        }, final=True)
                 return        
 
-        # Final reasoning summary prompt
+        steps_span.end()
+        activate(trace.root)
+        results = scheduler.results
 
+        # Final answer: given directly when the plan already produced it, synthesized otherwise
+        direct_answer = None
+        if config_manager.ENABLE_DIRECT_ANSWER:
+            direct_answer = derive_final_answer(reasoning_state["generated_plan"], results)
+        final_strategy, final_answer = direct_answer or ("synthesis", None)
 
-        messages = [
-                {"role": "system", "content": "You are an LLM agent that should provide an answer to a question."},
-                {"role": "system", "content": f"To answer the question you can use the following context {results} "},
-                {"role": "user", "content": f"The user original question is {user_question} provide just the answer to the quesiton."}
-            ]
-        
-        
-        yield {
-                "chat": "🧠 Wrapping up and generating final answer",
-                "debug": {
-                    "step": count_steps + 1,
-                    "title": "Wrapping up and generating final answer",
-                    "emoji" : "🧠",
-                    "css_class" : "generation-step",
-                    "messages" : messages
-                }
-            }
-            
-        await asyncio.sleep(1)
+        if final_answer is None:
+            # Final reasoning summary prompt
+            step_descriptions = {step["step_id"]: step["description"] for step in steps}
+            context, context_stats = context_builder.build(
+                (f"Step {step_id}: {step_descriptions.get(step_id, '')}", result)
+                for step_id, result in results.items()
+            )
+            messages = build_final_messages(context, user_question)
         
         
-        try:
-            final_answer = await llm_agent.run(messages=messages, add_tools=False)
-        except Exception as e:
-                logger.error("Failed to generate the final answer", exc_info=True)
-                yield   {   "chat": "❌ Failed to execute final answer generation step.", 
-                            "debug": 
-                                {   "step": "Error", 
-                                    "title": "Final answer generation step Failed", 
-                                    "emoji" : "❌",
-                                    "css_class" : "error-step", 
-                                    "error": str(e)
-                                
-                                }
+            yield traced({
+                    "chat": "🧠 Wrapping up and generating final answer",
+                    "debug": {
+                        "step": count_steps + 1,
+                        "title": "Wrapping up and generating final answer",
+                        "emoji" : "🧠",
+                        "css_class" : "generation-step",
+                        "messages" : messages,
+                        "context": context_stats
+                    }
+                })
+
+            final_span = trace.start_span("pipeline.final", parent=trace.root)
+            activate(final_span)
+            try:
+                if stream:
+                    chunks = []
+                    async for delta in llm_agent.stream(messages=messages, options=sampling_options, timeout=run_deadline.budget(config_manager.FINAL_TIMEOUT)):
+                        chunks.append(delta)
+                        yield {
+                            "chat": "".join(chunks),
+                            "stream": {"phase": "final", "step": count_steps + 1, "delta": delta}
                         }
-                return        
+                    final_answer = "".join(chunks).strip()
+                else:
+                    final_answer = await llm_agent.run(messages=messages, add_tools=False, options=sampling_options, timeout=run_deadline.budget(config_manager.FINAL_TIMEOUT))
+            except Exception as e:
+                    logger.error("Failed to generate the final answer", exc_info=True)
+                    final_span.end(error=e)
+                    yield traced({   "chat": "❌ Failed to execute final answer generation step.", 
+                                "debug": 
+                                    {   "step": "Error", 
+                                        "title": "Final answer generation step Failed", 
+                                        "emoji" : "❌",
+                                        "css_class" : "error-step", 
+                                        "error": str(e)
+                                
+                                    }
+                            }, final=True)
+                    return        
         
-        yield {
+            final_span.end()
+        else:
+            logger.info(f"⚡ Final answer derived from the plan ({final_strategy}), skipping the synthesis call.")
+            trace.start_span("pipeline.final", parent=trace.root, strategy=final_strategy).end()
+
+        yield traced({
             "chat": final_answer,
             "debug": {
                 "step": count_steps + 1,
                 "title": "Final Reasoning Result",
                 "emoji" : "✅",
                 "css_class" : "generation-step",
+                "final_strategy": final_strategy,
                 "final_answer": final_answer
             }
-        }
+        }, final=True)
    
     except Exception as e:
         logger.exception("Fatal error in pipeline.")
-        yield {"chat": "❌ A fatal error occurred in the process.", "debug": {"step": "fatal", "error": str(e)}}
+        yield traced({"chat": "❌ A fatal error occurred in the process.", "debug": {"step": "fatal", "error": str(e)}}, final=True)
+    finally:
+        if scheduler is not None:
+            await scheduler.cancel()
+        end_trace(trace)
+        await export_trace(trace)
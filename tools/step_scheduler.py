@@ -0,0 +1,235 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from core import logger
+
+
+@dataclass
+class StepEvent:
+    """
+    🔹 Lifecycle event reported by the StepScheduler for a single reasoning step.
+
+    kind is one of 'started', 'progress', 'completed' or 'failed'.
+    batch lists the step_ids executed together with this step in one call (empty when run alone).
+    """
+    kind: str
+    step: dict
+    index: int
+    dependency_results: List[Any] = field(default_factory=list)
+    progress: Any = None
+    result: Any = None
+    error: Optional[BaseException] = None
+    batch: List[Any] = field(default_factory=list)
+
+
+class StepScheduler:
+    """
+    🔹 StepScheduler: Executes reasoning steps as a dependency DAG.
+
+    Responsibilities:
+    - Start each step as soon as all of its dependencies have completed,
+      including while further steps are still being added.
+    - Cap how many steps run at the same time.
+    - Optionally hand batchable steps that become ready together with the
+      same dependencies to a single batch call.
+    - Report step lifecycle and progress events in the order they happen.
+    - Cancel outstanding work on failure or when the consumer stops early.
+
+    Only dependencies on steps that appear earlier in the plan are honoured.
+    This matches the sequential loop, where later or unknown step ids were
+    never part of the results yet, and keeps the graph acyclic.
+    """
+
+    def __init__(
+        self,
+        run_step: Callable[[dict, List[Any], Callable[[Any], None]], Awaitable[Any]],
+        max_concurrency: int = 4,
+        first_index: int = 1,
+        run_batch: Optional[Callable[[List[dict], List[Any], List[Callable[[Any], None]]], Awaitable[List[Any]]]] = None,
+        batchable: Optional[Callable[[dict], bool]] = None
+    ) -> None:
+        """
+        :param run_step: Coroutine function called with (step, dependency_results, report_progress).
+            Calling report_progress(payload) emits a 'progress' event for the step.
+        :param max_concurrency: Maximum number of steps (or batches) running at once.
+        :param first_index: Display index assigned to the first step of the plan.
+        :param run_batch: Coroutine function called with (steps, dependency_results, report_progress
+            callbacks) that returns one result per step. Batching is disabled when None.
+        :param batchable: Tells which steps may be batched. Batchable steps wait for close(),
+            so every step sharing their dependencies is known before they are grouped.
+        """
+        self.run_step = run_step
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.first_index = first_index
+        self.run_batch = run_batch
+        self.batchable = batchable or (lambda step: True)
+        self._steps: List[dict] = []
+        self._dependencies: List[List[int]] = []
+        self._position_by_id: Dict[Any, int] = {}
+        self._waiting: List[int] = []
+        self._done: set[int] = set()
+        self._results: Dict[int, Any] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._batches: Dict[int, List[Any]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._closed = False
+        self._stopped = False
+
+    def add_step(self, step: dict) -> None:
+        """
+        Register a step and start it right away if its dependencies are done.
+        Steps must be added in plan order.
+        """
+        if self._closed:
+            raise RuntimeError("Cannot add steps to a closed scheduler.")
+
+        position = len(self._steps)
+        dependencies = [
+            self._position_by_id[d]
+            for d in step.get("dependencies") or []
+            if d in self._position_by_id
+        ]
+        self._steps.append(step)
+        self._dependencies.append(dependencies)
+        self._position_by_id[step["step_id"]] = position
+        self._waiting.append(position)
+        self._launch_ready()
+        self._queue.put_nowait(None)
+
+    def close(self) -> None:
+        """
+        Signal that no more steps will be added.
+        """
+        self._closed = True
+        self._launch_ready()
+        self._queue.put_nowait(None)
+
+    @property
+    def steps(self) -> List[dict]:
+        """
+        Steps added so far, in plan order.
+        """
+        return list(self._steps)
+
+    @property
+    def results(self) -> Dict[Any, Any]:
+        """
+        Results of completed steps keyed by step_id, in plan order.
+        """
+        return {
+            self._steps[position]["step_id"]: self._results[position]
+            for position in sorted(self._results)
+        }
+
+    def _is_batchable(self, position: int) -> bool:
+        return self.run_batch is not None and self.batchable(self._steps[position])
+
+    def _launch_ready(self) -> None:
+        """
+        Start waiting steps whose dependencies are done, up to the concurrency cap.
+        """
+        if self._stopped:
+            return
+        ready = [
+            position for position in self._waiting
+            if all(d in self._done for d in self._dependencies[position])
+            and (self._closed or not self._is_batchable(position))
+        ]
+        while ready and len(set(self._tasks.values())) < self.max_concurrency:
+            group = [ready.pop(0)]
+            if self._is_batchable(group[0]):
+                group += [
+                    position for position in ready
+                    if self._is_batchable(position) and self._dependencies[position] == self._dependencies[group[0]]
+                ]
+                ready = [position for position in ready if position not in group]
+            self._start(group)
+
+    def _start(self, group: List[int]) -> None:
+        dependency_results = [self._results[d] for d in self._dependencies[group[0]]]
+        task = asyncio.create_task(self._execute(group, dependency_results))
+        for position in group:
+            self._waiting.remove(position)
+            self._tasks[position] = task
+            if len(group) > 1:
+                self._batches[position] = [self._steps[p]["step_id"] for p in group]
+            self._queue.put_nowait(("started", position, dependency_results))
+
+    async def _execute(self, group: List[int], dependency_results: List[Any]) -> None:
+        def progress_reporter(position: int) -> Callable[[Any], None]:
+            return lambda payload: self._queue.put_nowait(("progress", position, payload))
+
+        try:
+            if len(group) == 1:
+                results = [await self.run_step(self._steps[group[0]], dependency_results, progress_reporter(group[0]))]
+            else:
+                results = await self.run_batch(
+                    [self._steps[p] for p in group],
+                    dependency_results,
+                    [progress_reporter(p) for p in group]
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for position in group:
+                self._tasks.pop(position, None)
+            self._stopped = True
+            self._queue.put_nowait(("failed", group[0], e))
+            return
+
+        for position, result in zip(group, results):
+            self._tasks.pop(position, None)
+            self._done.add(position)
+            self._results[position] = result
+            self._queue.put_nowait(("completed", position, result))
+        # Dependents start here, without waiting for the consumer to read the event
+        self._launch_ready()
+
+    def _event(self, kind: str, position: int, **kwargs) -> StepEvent:
+        return StepEvent(
+            kind=kind,
+            step=self._steps[position],
+            index=self.first_index + position,
+            batch=self._batches.get(position, []),
+            **kwargs
+        )
+
+    async def events(self) -> AsyncIterator[StepEvent]:
+        """
+        Run the plan and yield StepEvents as steps start, progress, complete or fail.
+        Stops after the first failure.
+        """
+        try:
+            while True:
+                if self._closed and not self._waiting and not self._tasks and self._queue.empty():
+                    return
+
+                item = await self._queue.get()
+                if item is None:
+                    continue
+
+                kind, position, payload = item
+                if kind == "started":
+                    yield self._event("started", position, dependency_results=payload)
+                elif kind == "progress":
+                    yield self._event("progress", position, progress=payload)
+                elif kind == "failed":
+                    logger.error(f"❌ Reasoning step {self._steps[position].get('step_id')} failed: {payload}")
+                    yield self._event("failed", position, error=payload)
+                    return
+                else:
+                    yield self._event("completed", position, result=payload)
+        finally:
+            await self.cancel()
+
+    async def cancel(self) -> None:
+        """
+        Cancel every running step, start no new ones, and wait for them to finish.
+        """
+        self._stopped = True
+        tasks = list(set(self._tasks.values()))
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
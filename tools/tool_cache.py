@@ -0,0 +1,99 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+from core import logger, config_manager
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a cached tool result in bytes."""
+    try:
+        if hasattr(value, "model_dump_json"):  # Pydantic model (e.g. CallToolResult)
+            return len(value.model_dump_json())
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return len(str(value))
+
+
+class ToolResultCache:
+    """
+    🔹 ToolResultCache: In-memory cache of MCP tool results.
+
+    Responsibilities:
+    - Key results on server, tool name and canonicalized arguments.
+    - Expire entries after the TTL configured for each tool.
+    - Evict least-recently-used entries to stay under a memory bound.
+    - Count hits and misses for the debug view.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        """
+        :param max_bytes: Upper bound on the estimated size of all cached results.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(server_name: str, tool_name: str, arguments: dict | None) -> str:
+        """
+        Build a cache key; arguments are canonicalized so key order does not matter.
+        """
+        canonical_args = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{server_name}\x1f{tool_name}\x1f{canonical_args}"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a result. Returns (hit, value).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, size, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            self._remove(key)
+        self.misses += 1
+        return False, None
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        """
+        Store a result for `ttl` seconds, evicting old entries if needed.
+        """
+        size = _estimate_size(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            logger.debug(f"🗑️ Evicting cached tool result: {oldest_key.split(chr(31))[1]}")
+            self._remove(oldest_key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and current occupancy.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+
+
+# ✅ Process-wide cache shared by every tool executor
+tool_result_cache = ToolResultCache(max_bytes=config_manager.TOOL_CACHE_MAX_BYTES)
@@ -1,10 +1,11 @@
 from .components.ollama_interface import ollama_settings
 from .components.prompt_panel import prompt_settings
-from .components.chatbot_interface import chat_handler,debug_output
+from .components.chatbot_interface import chat_handler,debug_output,debug_payload_viewer
 
 __all__ =   [
                 "ollama_settings",
                 "prompt_settings",
                 "chat_handler",
-                "debug_output"
+                "debug_output",
+                "debug_payload_viewer"
             ]
\ No newline at end of file
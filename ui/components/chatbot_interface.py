@@ -1,65 +1,48 @@
-import json
-import html
+import asyncio
+from typing import Optional
 import gradio as gr
 from core import logger
-from tools import run_reasoning_pipeline, get_ollama_ai_agent
+from tools import run_reasoning_pipeline, get_ollama_ai_agent, residency_manager, admission_controller, AdmissionRejected
+from .debug_renderer import debug_renderers
 
-# 🔹 Load the Ollama-based MCP agent
+async def _ensure_model_loaded(selected_model):
+    # Joins a pre-warm already in progress; a failure here just means a cold first request
+    try:
+        await residency_manager.ensure_loaded(selected_model)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not preload model '{selected_model}': {e}")
+
+
+# 🔹 Load the Ollama-based agent backed by the shared MCP server pool
 async def load_agent(selected_model):
     try:
-        return await get_ollama_ai_agent(selected_model)
+        agent, _ = await asyncio.gather(
+            get_ollama_ai_agent(selected_model),
+            _ensure_model_loaded(selected_model)
+        )
+        return agent
     except Exception as e:
         logger.exception("Failed to load Ollama agent")
         raise RuntimeError("Could not initialize the AI agent.") from e
 
 
-def format_debug_markdown(debug_info: dict) -> str:
-    step = debug_info.get("step", "–")
-    title = debug_info.get("title", "")
-    emoji = debug_info.get("emoji", "")
-    css_class = debug_info.get("css_class", "")
-    cleaned_info = {k: v for k, v in debug_info.items() if k not in ["step", "title"]}
-
-    # Escape & format JSON nicely
-    inner = html.escape(json.dumps(cleaned_info, indent=2))
-
-    return f"""
-        <details class="debug-step" open>
-        <summary class="{css_class}">{emoji} Step {step} — {title}</summary>
-        <pre><code>{inner}</code></pre>
-        </details>
-    """
-
-
-def format_debug_html(debug_info: dict, open_by_default=True) -> str:
-    step = debug_info.get("step", "–")
-    title = debug_info.get("title", "")
-    emoji = debug_info.get("emoji", "")
-    css_class = debug_info.get("css_class", "")
-    open_tag = "open" if open_by_default else ""
-    
-    cleaned_info = {k: v for k, v in debug_info.items() if k not in ["step", "title"]}
-    inner = html.escape(json.dumps(cleaned_info, indent=2))
-
-  
-
-    return f"""
-        <details class="debug-step" {open_tag}>
-        <summary class="debug-summary {css_class}">{emoji} <strong>Step {step} — {title}</strong></summary>
-        <pre class="debug-code"><code>{inner}</code></pre>
-        </details>
-    """
-
+debug_output = gr.HTML()
 
+def _session_id(request: Optional[gr.Request]) -> str:
+    return getattr(request, "session_hash", None) or "default"
 
-debug_output = gr.HTML()
 
-async def chat_handler(message: str, history: list, llm_model, top_k: float, top_p: float, temperature: float):
+async def chat_handler(message: str, history: list, llm_model, top_k: float, top_p: float, temperature: float, request: gr.Request = None):
     """
     Streams assistant response step-by-step AND updates debug output in real-time.
-    Displays one chatbot message per reasoning step.
+    Displays one chatbot message per reasoning step; streamed tokens update that
+    message in place without touching the debug output.
+    Debug output is rendered incrementally by the session's DebugRenderer.
+    Runs go through the admission controller: the chat shows the queue
+    position while waiting, or a busy message when the queue is full.
     """
-    debug_lines = []
+    renderer = debug_renderers.get(_session_id(request))
+    renderer.reset()
 
     if not llm_model:
         yield [{"role": "assistant", "content": "⚠️ Please select a model first."}], ""
@@ -68,31 +51,60 @@ async def chat_handler(message: str, history: list, llm_model, top_k: float, top
     # Clear debug output at the beginning
     yield [], ""
     try:
-        ollama_client, ollama_agent = await load_agent(llm_model)
-
-        # Step-by-step reasoning
-        async for result in run_reasoning_pipeline(
-            user_question=message,
-            llm_agent=ollama_agent,
-            top_k=top_k,
-            top_p=top_p,
-            temperature=temperature
-        ):
-            # Get current reasoning info
-            chat_msg = result.get("chat", "...")
-            debug_info = result.get("debug", {})
-
-            # Format debug info
-            formatted_debug = format_debug_html(debug_info)
-            debug_lines.append(formatted_debug)
-            chat_msg = chat_msg.replace("\n", "<br>")
-
-            #  Append single message to chat history (one per step)
-            yield [{"role": "assistant", "content": chat_msg}], "\n\n\n".join(debug_lines)
-
+        async with admission_controller.ticket(llm_model, priority="interactive") as ticket:
+            async for position in admission_controller.wait(ticket):
+                yield [{"role": "assistant", "content": f"⏳ Waiting for '{llm_model}': position {position} in queue ..."}], ""
+
+            ollama_agent = await load_agent(llm_model)
+
+            # Step-by-step reasoning
+            async for result in run_reasoning_pipeline(
+                user_question=message,
+                llm_agent=ollama_agent,
+                top_k=top_k,
+                top_p=top_p,
+                temperature=temperature
+            ):
+                # Get current reasoning info
+                chat_msg = result.get("chat", "...")
+                debug_info = result.get("debug")
+
+                # Render only the new debug fragment (streamed partial output has none)
+                if debug_info is not None:
+                    renderer.append(debug_info)
+                chat_msg = chat_msg.replace("\n", "<br>")
+
+                #  Append single message to chat history (one per step)
+                yield [{"role": "assistant", "content": chat_msg}], renderer.html
+
+    except AdmissionRejected as e:
+        yield [{"role": "assistant", "content": f"🚦 {e}"}], ""
     finally:
         logger.debug("Pipeline execution completed.")
-        try:
-            await ollama_client.cleanup()
-        except Exception as e:
-            logger.warning(f"🧹 Cleanup failed: {e}")
\ No newline at end of file
+
+
+def expand_debug_payload(payload_id: str, request: gr.Request = None) -> str:
+    """
+    Return the full content of a collapsed debug field for the current session.
+    """
+    if not payload_id or not payload_id.strip():
+        return "⚠️ Enter a payload id shown in a collapsed debug field."
+    renderer = debug_renderers.get(_session_id(request), create=False)
+    payload = renderer.get_payload(payload_id) if renderer else None
+    if payload is None:
+        return f"⚠️ Payload '{payload_id.strip()}' is no longer available."
+    return payload
+
+
+def debug_payload_viewer():
+    """
+    Panel to load a collapsed debug payload on demand.
+    """
+    with gr.Blocks() as viewer:
+        with gr.Accordion("🔍 Expand collapsed payload", open=False):
+            with gr.Row():
+                payload_id = gr.Textbox(label="Payload id", placeholder="e.g. 7.output", scale=3)
+                expand_btn = gr.Button("Load", scale=1)
+            payload_view = gr.Code(label="Full payload", language="json", interactive=False)
+            expand_btn.click(fn=expand_debug_payload, inputs=payload_id, outputs=payload_view)
+    return viewer
@@ -0,0 +1,141 @@
+import json
+import html
+from collections import OrderedDict
+from typing import Optional
+from core import config_manager
+
+# Characters of a collapsed field shown inline; the rest is loaded on demand
+PREVIEW_CHARS = 300
+
+
+class DebugRenderer:
+    """
+    🔹 DebugRenderer: Append-only HTML renderer for one session's debug panel.
+
+    Responsibilities:
+    - Render each debug event once and append it to the panel. The HTML keeps a
+      stable prefix, so Gradio streams only the new fragment to the browser.
+    - Collapse oversized fields into a short preview; the full payload is kept
+      server-side and loaded on demand by its payload id.
+    - Bound memory: old steps are compacted in batches and stored payloads are
+      evicted oldest-first once over budget.
+    """
+
+    def __init__(
+        self,
+        max_steps: int = 200,
+        max_field_chars: int = 4000,
+        max_payload_bytes: int = 2 * 1024 * 1024
+    ) -> None:
+        """
+        :param max_steps: Maximum number of step fragments kept in the panel.
+        :param max_field_chars: Fields longer than this are collapsed to a preview.
+        :param max_payload_bytes: Budget for full payloads kept for on-demand expansion.
+        """
+        self.max_steps = max_steps
+        self.max_field_chars = max_field_chars
+        self.max_payload_bytes = max_payload_bytes
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new, empty panel (called at the start of each run)."""
+        self._fragments: list[str] = []
+        self._html = ""
+        self._counter = 0
+        self._payloads: "OrderedDict[str, str]" = OrderedDict()
+        self._payload_bytes = 0
+
+    @property
+    def html(self) -> str:
+        return self._html
+
+    def append(self, debug_info: dict, open_by_default: bool = True) -> str:
+        """
+        Render a debug event, append it to the panel and return the panel HTML.
+        """
+        self._counter += 1
+        fragment = self._render(debug_info, open_by_default)
+        self._fragments.append(fragment)
+
+        if len(self._fragments) > self.max_steps:
+            # Drop the oldest half at once so the prefix (and Gradio's diff) changes rarely
+            self._fragments = self._fragments[len(self._fragments) - self.max_steps // 2:]
+            self._html = "\n\n\n".join(self._fragments)
+        else:
+            self._html = f"{self._html}\n\n\n{fragment}" if self._html else fragment
+        return self._html
+
+    def get_payload(self, payload_id: str) -> Optional[str]:
+        """Return the full text of a collapsed field, if it is still stored."""
+        return self._payloads.get(payload_id.strip())
+
+    def _store_payload(self, payload_id: str, text: str) -> None:
+        self._payloads[payload_id] = text
+        self._payload_bytes += len(text)
+        while self._payload_bytes > self.max_payload_bytes and len(self._payloads) > 1:
+            _, evicted = self._payloads.popitem(last=False)
+            self._payload_bytes -= len(evicted)
+
+    def _render_field(self, key: str, value) -> str:
+        text = json.dumps(value, indent=2, default=str)
+        if len(text) <= self.max_field_chars:
+            return f"<b>{html.escape(key)}</b>: {html.escape(text)}"
+
+        payload_id = f"{self._counter}.{key}"
+        self._store_payload(payload_id, text)
+        preview = html.escape(text[:PREVIEW_CHARS])
+        return (
+            f"<details><summary><b>{html.escape(key)}</b>: {len(text):,} chars — "
+            f"collapsed, payload id <code>{html.escape(payload_id)}</code></summary>"
+            f"{preview}\n… [truncated]</details>"
+        )
+
+    def _render(self, debug_info: dict, open_by_default: bool) -> str:
+        step = debug_info.get("step", "–")
+        title = debug_info.get("title", "")
+        emoji = debug_info.get("emoji", "")
+        css_class = debug_info.get("css_class", "")
+        open_tag = "open" if open_by_default else ""
+
+        inner = "\n".join(
+            self._render_field(k, v)
+            for k, v in debug_info.items() if k not in ["step", "title"]
+        )
+
+        return f"""
+        <details class="debug-step" {open_tag}>
+        <summary class="debug-summary {css_class}">{emoji} <strong>Step {step} — {title}</strong></summary>
+        <pre class="debug-code"><code>{inner}</code></pre>
+        </details>
+    """
+
+
+class DebugRendererRegistry:
+    """
+    🔹 Keeps one DebugRenderer per chat session, evicting the least recently used sessions.
+    """
+
+    def __init__(self, max_sessions: int = 64) -> None:
+        self.max_sessions = max_sessions
+        self._renderers: "OrderedDict[str, DebugRenderer]" = OrderedDict()
+
+    def get(self, session_id: str, create: bool = True) -> Optional[DebugRenderer]:
+        renderer = self._renderers.get(session_id)
+        if renderer is not None:
+            self._renderers.move_to_end(session_id)
+            return renderer
+        if not create:
+            return None
+
+        renderer = DebugRenderer(
+            max_steps=config_manager.DEBUG_MAX_STEPS,
+            max_field_chars=config_manager.DEBUG_MAX_FIELD_CHARS,
+            max_payload_bytes=config_manager.DEBUG_MAX_PAYLOAD_BYTES
+        )
+        self._renderers[session_id] = renderer
+        while len(self._renderers) > self.max_sessions:
+            self._renderers.popitem(last=False)
+        return renderer
+
+
+debug_renderers = DebugRendererRegistry(max_sessions=config_manager.DEBUG_MAX_SESSIONS)
@@ -1,5 +1,5 @@
 import gradio as gr
-from tools import list_models_with_status, run_model, stop_model
+from tools import list_models_with_status, run_model, stop_model, residency_manager
 
 
 def _update_model_table_status(table, model_name, new_status_icon):
@@ -13,9 +13,16 @@ def _update_model_table_status(table, model_name, new_status_icon):
     return table
 
 
-def _get_model_table():
-    """Return the model table with status icons."""
-    models = list_models_with_status()
+def _inventory_error(models):
+    """Return the error reported instead of the model list, if any."""
+    return next((m["error"] for m in models if "error" in m), None)
+
+
+def _get_model_table(models):
+    """Return the model table with status icons, or a status row when Ollama can't be reached."""
+    error = _inventory_error(models)
+    if error:
+        return [[error, "", "", "⚠️ Unavailable"]]
     return [
         [model["name"], model["size"], model["modified"], "🟢 Running" if model["status"] == "running" else "🔴 Stopped"]
         for model in models
@@ -35,18 +42,18 @@ def _make_alert(model_name):
     """
 
 
-def _get_model_options():
+def _get_model_options(models):
     """Return startable and stoppable models."""
-    models = list_models_with_status()
+    models = [m for m in models if "error" not in m]
     startable = [m["name"] for m in models if m["status"] != "running"]
     stoppable = [m["name"] for m in models if m["status"] == "running"]
     return startable, stoppable, stoppable[:]
 
 
-def _handle_run(model_name, table, startable, stoppable):
+async def _handle_run(model_name, table, startable, stoppable):
     """Handle model start."""
     if model_name:
-        run_model(model_name)
+        await run_model(model_name)
         table = _update_model_table_status(table, model_name, "🟢 Running")
         startable = [m for m in startable if m != model_name]
         if model_name not in stoppable:
@@ -63,10 +70,10 @@ def _handle_run(model_name, table, startable, stoppable):
     )
 
 
-def _handle_stop(model_name, table, startable, stoppable):
+async def _handle_stop(model_name, table, startable, stoppable):
     """Handle model stop."""
     if model_name:
-        stop_model(model_name)
+        await stop_model(model_name)
         table = _update_model_table_status(table, model_name, "🔴 Stopped")
         stoppable = [m for m in stoppable if m != model_name]
         if model_name not in startable:
@@ -83,10 +90,19 @@ def _handle_stop(model_name, table, startable, stoppable):
     )
 
 
-def _refresh_all():
-    """Initial loading of model table and states."""
-    table = _get_model_table()
-    startable, stoppable, running = _get_model_options()
+async def _prewarm(model_name):
+    """Start loading the selected model in the background."""
+    residency_manager.prewarm(model_name)
+
+
+async def _refresh_all():
+    """Initial loading of model table and states (one inventory lookup)."""
+    models = await list_models_with_status()
+    error = _inventory_error(models)
+    if error:
+        gr.Warning(error)
+    table = _get_model_table(models)
+    startable, stoppable, running = _get_model_options(models)
     default_model = running[0] if running else None
     return (
         table,
@@ -166,6 +182,13 @@ def ollama_settings(external_display: gr.Textbox | gr.HTML,selected_model_state:
                 outputs=external_display
             )
 
+            # Load the selected model ahead of the first chat
+            selected_model_state.change(
+                fn=_prewarm,
+                inputs=selected_model_state,
+                outputs=None
+            )
+
             # Load models on startup
             interface.load(
                 fn=_refresh_all,